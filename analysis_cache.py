@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Analysis Cache Module
+Shares transcript analysis between Stop and SessionEnd
+
+The cache holds the items of the latest turn, keyed by transcript path
+plus (inode, size, mtime). An unchanged transcript reuses the cached
+result; a grown transcript only analyzes the appended bytes and merges
+them into the same turn. Values stored with set_cached_value() (git
+status, GitLab push result, ...) are valid until the transcript changes.
+"""
+import json
+import os
+
+from analyze_transcript import analyze_items, build_result
+
+
+def get_cache_file(transcript_path):
+    """Return per-session cache file path"""
+    session_id = os.path.basename(transcript_path).replace('.jsonl', '')
+    return f"/tmp/.claude-analysis-{session_id}.json"
+
+
+def get_fingerprint(transcript_path):
+    """Return (inode, size, mtime) of the transcript"""
+    st = os.stat(transcript_path)
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def load_cache(transcript_path):
+    """Load cache entry for the transcript (empty dict if missing/invalid)"""
+    try:
+        with open(get_cache_file(transcript_path), 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        if entry.get('path') == os.path.abspath(transcript_path):
+            return entry
+    except:
+        pass
+    return {}
+
+
+def save_cache(transcript_path, entry):
+    """Atomically write cache entry"""
+    cache_file = get_cache_file(transcript_path)
+    try:
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_file, cache_file)
+    except:
+        pass
+
+
+def merge_items(base, delta):
+    """Extend the items of a turn with items from appended bytes"""
+    merged = {}
+    for key in ('todos', 'requests', 'plans', 'thinkings', 'files', 'tasks'):
+        merged[key] = list(base.get(key, []))
+
+    seen_todos = set(t['content'] for t in merged['todos'])
+    for todo in delta['todos']:
+        if todo['content'] not in seen_todos:
+            seen_todos.add(todo['content'])
+            merged['todos'].append(todo)
+
+    for key in ('requests', 'plans', 'thinkings', 'files', 'tasks'):
+        seen = set(merged[key])
+        merged[key].extend(item for item in delta.get(key, []) if item not in seen)
+
+    merged['commands'] = list(base.get('commands', [])) + delta['commands']
+    return merged
+
+
+def get_analysis(transcript_path):
+    """
+    Analyze transcript, reusing or extending the cached turn
+    Returns: AnalysisResult (raises OSError if the transcript can't be read)
+    """
+    fingerprint = get_fingerprint(transcript_path)
+    entry = load_cache(transcript_path)
+
+    # 변경 없음 - 캐시 재사용
+    if entry.get('fingerprint') == fingerprint:
+        return build_result(entry['items'])
+
+    delta = analyze_items(transcript_path)
+
+    cached_fp = entry.get('fingerprint')
+    same_turn = (
+        cached_fp is not None
+        and cached_fp[0] == fingerprint[0]
+        and cached_fp[1] <= fingerprint[1]
+        and not delta['new_turn']
+    )
+    items = merge_items(entry['items'], delta) if same_turn else merge_items({}, delta)
+
+    save_cache(transcript_path, {
+        'path': os.path.abspath(transcript_path),
+        'fingerprint': fingerprint,
+        'items': items,
+        'values': {},
+    })
+    return build_result(items)
+
+
+def get_cached_value(transcript_path, key):
+    """Return a value stored for the current transcript state (None if stale)"""
+    try:
+        entry = load_cache(transcript_path)
+        if entry.get('fingerprint') == get_fingerprint(transcript_path):
+            return entry.get('values', {}).get(key)
+    except:
+        pass
+    return None
+
+
+def set_cached_value(transcript_path, key, value):
+    """Store a value valid until the transcript changes"""
+    try:
+        entry = load_cache(transcript_path)
+        if entry.get('fingerprint') != get_fingerprint(transcript_path):
+            return
+        entry.setdefault('values', {})[key] = value
+        save_cache(transcript_path, entry)
+    except:
+        pass
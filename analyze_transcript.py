@@ -2,43 +2,290 @@
 """
 Claude Transcript Analyzer
 Extracts todos, thinking, and work summary from Claude Code transcripts
+
+Usage as a module (hooks):
+    from analyze_transcript import analyze_transcript
+    result = analyze_transcript(transcript_path)
+
+Usage from the command line:
+    analyze_transcript.py <transcript.jsonl> [--json]
 """
 import json
 import sys
 import os
-import hashlib
 
-if len(sys.argv) < 2:
-    print("ERROR: No transcript path provided", file=sys.stderr)
-    sys.exit(1)
+from keyword_rules import get_classifier
+from reported_store import ReportedStore, cleanup_stale_files
+
+# 역방향 읽기 블록 크기
+BLOCK_SIZE = 64 * 1024
+# 세션별 상태 파일 (TTL 정리 대상)
+STATE_FILE_PATTERNS = ['.claude-reported-*', '.claude-offset-*', '.claude-analysis-*']
+
+# JSON 디코딩 전 raw bytes 사전 분류용 토큰
+USER_ROLE_TOKENS = (b'"role":"user"', b'"role": "user"')
+TOOL_RESULT_TOKENS = (b'"type":"tool_result"', b'"type": "tool_result"')
+
+
+class AnalysisResult:
+    """Structured result of a transcript analysis"""
+
+    __slots__ = ('summary', 'todos', 'thinking', 'plan', 'files', 'commands', 'tasks')
+
+    def __init__(self, summary='', todos=None, thinking='', plan='', files=None, commands=None, tasks=None):
+        self.summary = summary          # 작업 요약 (Slack 제목)
+        self.todos = todos or []        # 작업 내역 (표시용 문자열)
+        self.thinking = thinking        # 검토 사항 (첫 문장)
+        self.plan = plan                # 작업 계획 (마크다운)
+        self.files = files or []        # 수정된 파일 경로
+        self.commands = commands or []  # Bash 명령 [{'cmd', 'desc'}]
+        self.tasks = tasks or []        # 위임한 서브에이전트 작업 설명
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"AnalysisResult(summary={self.summary!r}, todos={len(self.todos)}, files={len(self.files)})"
+
+
+def get_state_files(transcript_path):
+    """Return per-session (reported_file, checkpoint_file) paths"""
+    # 세션별 보고 이력 파일
+    session_id = os.path.basename(transcript_path).replace('.jsonl', '')
+    reported_file = f"/tmp/.claude-reported-{session_id}.bin"
+    # 세션별 읽기 위치 체크포인트 (inode, byte offset)
+    checkpoint_file = f"/tmp/.claude-offset-{session_id}"
+    return reported_file, checkpoint_file
+
+
+def load_checkpoint(checkpoint_file):
+    """Load (inode, offset) of the last analyzed position"""
+    try:
+        with open(checkpoint_file, 'r') as f:
+            inode, offset = f.read().split()
+        return int(inode), int(offset)
+    except:
+        return None, 0
+
+
+def save_checkpoint(checkpoint_file, inode, offset):
+    """Persist (inode, offset) so the next run only reads appended bytes"""
+    try:
+        tmp_file = f"{checkpoint_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            f.write(f"{inode} {offset}")
+        os.replace(tmp_file, checkpoint_file)
+    except:
+        pass
+
+
+def iter_lines_reverse(f, start, end, block_size=BLOCK_SIZE):
+    """
+    Yield (offset, line) pairs newest-first by seeking backwards from `end`
+    in fixed-size blocks, never reading before `start`.
+    Only the pieces of the line currently being assembled are buffered.
+    """
+    pos = end
+    pending = []
+    while pos > start:
+        read_size = min(block_size, pos - start)
+        pos -= read_size
+        f.seek(pos)
+        chunk = f.read(read_size)
+
+        chunk_end = len(chunk)
+        idx = chunk.rfind(b'\n', 0, chunk_end)
+        while idx != -1:
+            pending.append(chunk[idx + 1:chunk_end])
+            yield pos + idx + 1, b''.join(reversed(pending))
+            pending = []
+            chunk_end = idx
+            idx = chunk.rfind(b'\n', 0, chunk_end)
+        pending.append(chunk[:chunk_end])
+
+    if pending:
+        yield start, b''.join(reversed(pending))
+
+
+def is_user_prompt(msg):
+    """Check if a record is a real user prompt (not a tool_result echo)"""
+    message = msg.get('message')
+    if not isinstance(message, dict) or message.get('role') != 'user' or msg.get('isMeta'):
+        return False
+
+    content = message.get('content', '')
+    if isinstance(content, str):
+        return bool(content.strip())
+    if isinstance(content, list):
+        types = [block.get('type') for block in content if isinstance(block, dict)]
+        return 'text' in types and 'tool_result' not in types
+    return False
+
+
+def should_decode(line):
+    """
+    Cheap raw-bytes check whether a line can hold anything the analyzer uses.
+    Quoted tokens can't match inside JSON string values (quotes are escaped
+    there), so large tool_result payloads are skipped with a substring search.
+    """
+    if any(token in line for token in USER_ROLE_TOKENS):
+        # tool_result 응답은 사용자 요청이 아님
+        return not any(token in line for token in TOOL_RESULT_TOKENS)
+    return any(token in line for token in INTERESTING_TOKENS)
+
+
+def read_last_turn(path, checkpoint_file):
+    """
+    Read the records of the most recent turn, newest-first from EOF,
+    stopping at the last real user prompt or the previous checkpoint.
+    Falls back to a full rescan when the file shrank or was replaced.
+    Returns: (records in chronological order, inode, new_offset)
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        inode, offset = load_checkpoint(checkpoint_file)
+
+        if inode != st.st_ino or offset > st.st_size:
+            # 파일이 교체되었거나 줄어듦 - 전체 재분석
+            offset = 0
+
+        # 마지막 줄이 아직 기록 중이면 다음 실행으로 미룸
+        next_offset = st.st_size
+        if st.st_size > offset:
+            f.seek(st.st_size - 1)
+            partial_tail = f.read(1) != b'\n'
+        else:
+            partial_tail = False
 
-transcript_path = sys.argv[1]
-# 세션별 보고 이력 파일
-session_id = os.path.basename(transcript_path).replace('.jsonl', '')
-reported_file = f"/tmp/.claude-reported-{session_id}"
+        records = []
+        for line_offset, line in iter_lines_reverse(f, offset, st.st_size):
+            if partial_tail:
+                partial_tail = False
+                next_offset = line_offset
+                continue
+            if not should_decode(line):
+                continue
+            try:
+                msg = json.loads(line)
+            except:
+                continue
+            records.append(msg)
+            if is_user_prompt(msg):
+                break
+
+    records.reverse()
+    return records, st.st_ino, next_offset
+
+
+class Extraction:
+    """Accumulates extracted items in insertion-ordered sets (dict keys)"""
 
-try:
-    with open(transcript_path, 'r') as f:
-        lines = f.readlines()
+    def __init__(self):
+        self.todos = {}       # content -> status (처음 본 상태 유지)
+        self.thinkings = {}
+        self.requests = {}
+        self.plans = {}
+        self.files = {}
+        self.tasks = {}
+        self.commands = []
+
+    def to_items(self):
+        return {
+            'todos': [{'content': content, 'status': status} for content, status in self.todos.items()],
+            'thinkings': list(self.thinkings),
+            'requests': list(self.requests),
+            'plans': list(self.plans),
+            'files': list(self.files),
+            'tasks': list(self.tasks),
+            'commands': self.commands,
+        }
+
+
+# (block_type, tool_name) -> handler(block, extraction)
+EXTRACTORS = {}
+
+
+def extractor(block_type, tool_name=None):
+    """Register a handler for a content block type (and tool name)"""
+    def register(func):
+        EXTRACTORS[(block_type, tool_name)] = func
+        return func
+    return register
+
+
+# ExitPlanMode 추출 (Plan 모드)
+@extractor('tool_use', 'ExitPlanMode')
+def extract_plan(block, ex):
+    plan_text = block.get('input', {}).get('plan', '')
+    if plan_text:
+        ex.plans.setdefault(plan_text)
+
+
+# TodoWrite 추출
+@extractor('tool_use', 'TodoWrite')
+def extract_todos(block, ex):
+    for todo in block.get('input', {}).get('todos', []):
+        content_text = todo.get('content', '')
+        if content_text and content_text not in ex.todos:
+            ex.todos[content_text] = todo.get('status', 'pending')
+
+
+# 파일 수정 추출 (Edit/Write/MultiEdit)
+@extractor('tool_use', 'Edit')
+@extractor('tool_use', 'Write')
+@extractor('tool_use', 'MultiEdit')
+def extract_file(block, ex):
+    file_path = block.get('input', {}).get('file_path', '')
+    if file_path:
+        ex.files.setdefault(file_path)
+
+
+# 노트북 수정 추출
+@extractor('tool_use', 'NotebookEdit')
+def extract_notebook(block, ex):
+    notebook_path = block.get('input', {}).get('notebook_path', '')
+    if notebook_path:
+        ex.files.setdefault(notebook_path)
+
+
+# Bash 명령 추출
+@extractor('tool_use', 'Bash')
+def extract_command(block, ex):
+    input_data = block.get('input', {})
+    command = input_data.get('command', '')
+    desc = input_data.get('description', '')
+    if command and len(command) < 200:
+        ex.commands.append({'cmd': command, 'desc': desc})
+
+
+# 서브에이전트 작업 추출
+@extractor('tool_use', 'Task')
+def extract_task(block, ex):
+    description = block.get('input', {}).get('description', '').strip()
+    if description:
+        ex.tasks.setdefault(description[:100])
+
+
+# Thinking 추출 (의미있는 것만)
+@extractor('thinking')
+def extract_thinking(block, ex):
+    thinking_text = block.get('thinking', '').strip()
+    if len(thinking_text) > 50:
+        ex.thinkings.setdefault(thinking_text[:200])
 
-    # 이전에 보고한 내용 로드
-    reported_items = set()
-    if os.path.exists(reported_file):
-        with open(reported_file, 'r') as f:
-            reported_items = set(line.strip() for line in f.readlines())
-
-    todos_list = []
-    thinkings = []
-    user_requests = []
-    plans = []
-    files_modified = []
-    bash_commands = []
-
-    # 최근 메시지 분석 (마지막 100개 - 충분한 컨텍스트)
-    for line in lines[-100:]:
+
+# 등록된 핸들러가 있는 블록만 디코딩 (예: b'"TodoWrite"', b'"thinking"')
+INTERESTING_TOKENS = tuple(set(
+    f'"{tool_name or block_type}"'.encode() for block_type, tool_name in EXTRACTORS
+))
+
+
+def extract_items(records):
+    """Extract requests, todos, plans, files, commands and thinking from records"""
+    ex = Extraction()
+
+    for msg in records:
         try:
-            msg = json.loads(line)
-
             # message 필드 확인
             if 'message' not in msg:
                 continue
@@ -51,15 +298,11 @@ try:
                 content = message.get('content', '')
                 if isinstance(content, str) and len(content) > 20:
                     # 의미있는 요청만
-                    if content not in user_requests and not content.lower() in ['ok', 'yes', '네', '확인']:
-                        user_requests.append(content[:100])
+                    if not content.lower() in ['ok', 'yes', '네', '확인']:
+                        ex.requests.setdefault(content[:100])
 
             # assistant의 content 확인
-            if 'content' in message:
-                content = message['content']
-            else:
-                continue
-
+            content = message.get('content')
             if not isinstance(content, list):
                 continue
 
@@ -67,77 +310,38 @@ try:
                 if not isinstance(block, dict):
                     continue
 
-                block_type = block.get('type', '')
-
-                # ExitPlanMode 추출 (Plan 모드)
-                if block_type == 'tool_use' and block.get('name') == 'ExitPlanMode':
-                    input_data = block.get('input', {})
-                    plan_text = input_data.get('plan', '')
-                    if plan_text and plan_text not in plans:
-                        plans.append(plan_text)
-
-                # TodoWrite 추출
-                elif block_type == 'tool_use' and block.get('name') == 'TodoWrite':
-                    input_data = block.get('input', {})
-                    todos = input_data.get('todos', [])
-                    for todo in todos:
-                        content_text = todo.get('content', '')
-                        status = todo.get('status', 'pending')
-                        if content_text and content_text not in [t['content'] for t in todos_list]:
-                            todos_list.append({'content': content_text, 'status': status})
-
-                # 파일 수정 추출 (Edit/Write)
-                elif block_type == 'tool_use' and block.get('name') in ['Edit', 'Write']:
-                    input_data = block.get('input', {})
-                    file_path = input_data.get('file_path', '')
-                    if file_path and file_path not in files_modified:
-                        files_modified.append(file_path)
-
-                # Bash 명령 추출
-                elif block_type == 'tool_use' and block.get('name') == 'Bash':
-                    input_data = block.get('input', {})
-                    command = input_data.get('command', '')
-                    desc = input_data.get('description', '')
-                    if command and len(command) < 200:
-                        bash_commands.append({'cmd': command, 'desc': desc})
-
-                # Thinking 추출 (의미있는 것만)
-                elif block_type == 'thinking':
-                    thinking_text = block.get('thinking', '').strip()
-                    if len(thinking_text) > 50 and thinking_text not in thinkings:
-                        thinkings.append(thinking_text[:200])
+                handler = EXTRACTORS.get((block.get('type', ''), block.get('name')))
+                if handler:
+                    handler(block, ex)
 
         except:
             continue
 
+    return ex.to_items()
+
+
+def filter_reported(items, reported_file):
+    """Keep only todos/requests/plans not reported before and record them"""
+    # 새 세션 시작 시 오래된 세션 상태 파일 정리
+    if not os.path.exists(reported_file):
+        cleanup_stale_files(os.path.dirname(reported_file), STATE_FILE_PATTERNS)
+
+    # 이전에 보고한 내용 로드
+    store = ReportedStore(reported_file)
+
     # 신규 항목만 필터링
-    new_todos = []
-    new_requests = []
-    new_plans = []
-
-    for todo in todos_list:
-        todo_hash = hashlib.md5(todo['content'].encode()).hexdigest()
-        if todo_hash not in reported_items:
-            new_todos.append(todo)
-            reported_items.add(todo_hash)
-
-    for req in user_requests:
-        req_hash = hashlib.md5(req.encode()).hexdigest()
-        if req_hash not in reported_items:
-            new_requests.append(req)
-            reported_items.add(req_hash)
-
-    for plan in plans:
-        plan_hash = hashlib.md5(plan.encode()).hexdigest()
-        if plan_hash not in reported_items:
-            new_plans.append(plan)
-            reported_items.add(plan_hash)
-
-    # 보고 이력 저장
-    with open(reported_file, 'w') as f:
-        f.write('\n'.join(reported_items))
-
-    # 실제 작업 내용 기반 요약 생성
+    new_todos = [todo for todo in items['todos'] if store.add(todo['content'])]
+    new_requests = [req for req in items['requests'] if store.add(req)]
+    new_plans = [plan for plan in items['plans'] if store.add(plan)]
+
+    # 보고 이력 저장 (신규 항목만 추가 기록)
+    store.flush()
+
+    return new_todos, new_requests, new_plans
+
+
+def summarize_command(new_todos, files_modified, bash_commands, new_requests):
+    """Build a short work summary from what was actually done"""
     command_summary = ""
 
     # 1순위: completed todos에서 요약 생성
@@ -191,23 +395,11 @@ try:
     # 4순위: 사용자 요청 키워드 기반
     elif new_requests:
         req = new_requests[-1]
-        req_lower = req.lower()
-
-        # 키워드 매칭으로 작업 유형 추론
-        if 'gitlab' in req_lower and ('푸시' in req or 'push' in req_lower):
-            command_summary = "GitLab 자동 푸시"
-        elif 'gitlab' in req_lower and ('저장소' in req or 'repository' in req_lower):
-            command_summary = "GitLab 저장소 설정"
-        elif 'hook' in req_lower and '설치' in req:
-            command_summary = "Hook 시스템 설치"
-        elif '분석' in req and ('코드' in req or '프로젝트' in req):
-            command_summary = "프로젝트 분석"
-        elif '수정' in req or 'fix' in req_lower:
-            command_summary = "버그 수정"
-        elif '추가' in req or 'add' in req_lower:
-            command_summary = "기능 추가"
-        elif '개선' in req or 'improve' in req_lower:
-            command_summary = "기능 개선"
+
+        # 키워드 규칙으로 작업 유형 추론 (classify_rules.json)
+        matched, label = get_classifier('summary').classify(req)
+        if matched and label:
+            command_summary = label
         else:
             # 사용자 요청 첫 50자 사용
             command_summary = req[:50]
@@ -216,127 +408,174 @@ try:
     else:
         command_summary = "작업 완료"
 
-    # 파일 작업을 투두 리스트로 변환
+    return command_summary
+
+
+def infer_work_todos(new_requests):
+    """Turn the latest user request into work todo descriptions"""
     work_todos = []
 
     if new_requests:
-        req = new_requests[-1]
-        req_lower = req.lower()
-
-        # 문장 정리 (감탄사, 불필요한 기호 제거)
-        req_clean = req.replace('!', '').replace('?', '').strip()
-
-        # 키워드 기반 이해한 내용으로 정리
-        if 'hook' in req_lower and ('안걸' in req or '작동' in req or '안돼' in req):
-            work_todos.append("팀원 환경에서 Hook 작동 문제 진단 및 해결")
-        elif 'gitlab' in req_lower:
-            if '푸시' in req or 'push' in req_lower:
-                work_todos.append("GitLab 저장소 생성 및 코드 푸시 작업")
-            elif '생성' in req or 'create' in req_lower:
-                work_todos.append("GitLab 저장소 생성")
-        elif '웹사이트' in req and ('분석' in req or 'analyze' in req_lower):
-            work_todos.append("웹사이트 성능 및 보안 종합 분석 수행")
-        elif '분석' in req or 'analyze' in req_lower:
-            if '프로젝트' in req or 'project' in req_lower:
-                work_todos.append("프로젝트 구조 및 설정 분석")
-            elif '환경' in req:
-                work_todos.append("실행 환경 호환성 분석")
-            else:
-                work_todos.append("코드베이스 검토 및 분석")
-        elif '검토' in req or 'review' in req_lower or '확인' in req:
-            if '설치' in req:
-                work_todos.append("설치 프로세스 검토 및 개선")
-            elif '버전' in req:
-                work_todos.append("버전 호환성 검토")
-            else:
-                work_todos.append("코드 품질 검토 및 개선사항 도출")
-        elif '한글' in req and ('깨' in req or 'encoding' in req_lower):
-            work_todos.append("한글 인코딩 문제 해결 및 크로스 플랫폼 지원")
-        elif 'readme' in req_lower or '문서' in req:
-            if '작성' in req or 'write' in req_lower:
-                work_todos.append("팀원용 설치 가이드 문서 작성")
-            else:
-                work_todos.append("문서 개선 및 업데이트")
-        elif 'claude' in req_lower and ('설치' in req or 'install' in req_lower):
-            work_todos.append("Claude Hooks Slack 통합 시스템 설치 및 설정")
-        elif '설치' in req or 'install' in req_lower:
-            work_todos.append("필요 패키지 설치 및 개발 환경 구성")
-        elif '업데이트' in req or 'update' in req_lower:
-            work_todos.append("최신 버전으로 업데이트 적용")
-        elif ('수정' in req or 'fix' in req_lower or '고쳐' in req) and '중복' in req:
-            work_todos.append("중복 메시지 전송 문제 해결")
-        elif '수정' in req or 'fix' in req_lower or '고쳐' in req:
-            work_todos.append("코드 오류 수정 및 기능 개선")
-        elif '테스트' in req or 'test' in req_lower:
-            work_todos.append("기능 테스트 및 동작 검증")
-        elif '배포' in req or 'deploy' in req_lower:
-            work_todos.append("프로덕션 환경 배포 준비")
-        elif ('모든' in req or 'all' in req_lower) and '환경' in req:
-            work_todos.append("크로스 플랫폼 호환성 확보 작업")
-        elif '중복' in req:
-            work_todos.append("중복 보고 방지 로직 구현")
+        # 키워드 규칙 기반 이해한 내용으로 정리 (classify_rules.json)
+        matched, label = get_classifier('work_todos').classify(new_requests[-1])
+        if label:
+            work_todos.append(label)
+
+    return work_todos
 
-    # 사용자 명령 요약 출력 (최우선)
-    if command_summary:
-        print("COMMAND_SUMMARY_START")
-        print(command_summary)
-        print("COMMAND_SUMMARY_END")
 
-    # 출력 - 신규 항목만
+def format_todos(new_todos, work_todos, files_modified):
+    """Format todo lines for display (todos > work todos > modified files)"""
+    lines = []
+
     if new_todos:
         # 모든 상태의 todos 표시 (최대 10개)
-        print("TODOS_START")
         for todo in new_todos[-10:]:
             icon = "✅" if todo['status'] == 'completed' else "🔄" if todo['status'] == 'in_progress' else "⏳"
-            print(f"{icon} {todo['content']}")
-        print("TODOS_END")
+            lines.append(f"{icon} {todo['content']}")
     elif work_todos:
-        print("TODOS_START")
         for idx, work in enumerate(work_todos, 1):
-            print(f"{idx}. ✅ {work}")
-        print("TODOS_END")
+            lines.append(f"{idx}. ✅ {work}")
     elif files_modified:
         # todos가 없으면 파일 수정 내역 표시
-        print("TODOS_START")
         for idx, file_path in enumerate(files_modified[:10], 1):
             file_name = os.path.basename(file_path)
-            print(f"{idx}. 📝 {file_name}")
+            lines.append(f"{idx}. 📝 {file_name}")
         if len(files_modified) > 10:
-            print(f"...외 {len(files_modified) - 10}개")
-        print("TODOS_END")
-
-    if thinkings:
-        # Thinking 정리 (중간 과정 제거, 결과만)
-        t = thinkings[-1]
-
-        # 불필요한 문구 제거
-        clean_thinking = t
-        remove_phrases = [
-            '좋습니다.', '완벽합니다.', '이제', '그리고', '하지만',
-            '사용자가', '제가', '해야 합니다', '하겠습니다',
-            '...', '!'
-        ]
-        for phrase in remove_phrases:
-            clean_thinking = clean_thinking.replace(phrase, '')
-
-        # 핵심만 추출 (첫 문장만)
-        clean_thinking = clean_thinking.strip().split('.')[0].strip()
-
-        # 최소 길이 확인
-        if len(clean_thinking) > 20:
-            print("THINKING_START")
-            print(f"• {clean_thinking}")
-            print("THINKING_END")
-
-    # Plan 출력 (새로운 계획만)
-    if new_plans:
-        print("PLAN_START")
-        # 최신 계획만 출력 (보통 하나만 있음)
-        plan = new_plans[-1]
-        # Plan은 이미 잘 정리된 마크다운이므로 그대로 출력
-        print(plan[:500])  # 최대 500자로 제한
-        print("PLAN_END")
-
-except Exception as e:
-    print(f"ERROR:{str(e)}", file=sys.stderr)
-    sys.exit(1)
+            lines.append(f"...외 {len(files_modified) - 10}개")
+
+    return lines
+
+
+def clean_thinking(thinkings):
+    """Reduce the latest thinking block to its first meaningful sentence"""
+    if not thinkings:
+        return ''
+
+    # Thinking 정리 (중간 과정 제거, 결과만)
+    clean_text = thinkings[-1]
+
+    # 불필요한 문구 제거
+    remove_phrases = [
+        '좋습니다.', '완벽합니다.', '이제', '그리고', '하지만',
+        '사용자가', '제가', '해야 합니다', '하겠습니다',
+        '...', '!'
+    ]
+    for phrase in remove_phrases:
+        clean_text = clean_text.replace(phrase, '')
+
+    # 핵심만 추출 (첫 문장만)
+    clean_text = clean_text.strip().split('.')[0].strip()
+
+    # 최소 길이 확인
+    return clean_text if len(clean_text) > 20 else ''
+
+
+def analyze_items(transcript_path):
+    """
+    Extract the not-yet-reported items of the newest turn and advance
+    the checkpoint. Items can be merged across runs and rendered with
+    build_result().
+    """
+    reported_file, checkpoint_file = get_state_files(transcript_path)
+
+    records, transcript_inode, next_offset = read_last_turn(transcript_path, checkpoint_file)
+    items = extract_items(records)
+    items['todos'], items['requests'], items['plans'] = filter_reported(items, reported_file)
+    save_checkpoint(checkpoint_file, transcript_inode, next_offset)
+
+    # 새 턴 시작 여부 (사용자 요청부터 읽었는지)
+    items['new_turn'] = bool(records) and is_user_prompt(records[0])
+    return items
+
+
+def build_result(items):
+    """Render extracted items into an AnalysisResult"""
+    work_todos = infer_work_todos(items['requests'])
+
+    return AnalysisResult(
+        summary=summarize_command(items['todos'], items['files'], items['commands'], items['requests']),
+        todos=format_todos(items['todos'], work_todos, items['files']),
+        thinking=clean_thinking(items['thinkings']),
+        # 최신 계획만 (보통 하나만 있음), 최대 500자
+        plan=items['plans'][-1][:500] if items['plans'] else '',
+        files=items['files'],
+        commands=items['commands'],
+        tasks=items.get('tasks', []),
+    )
+
+
+def analyze_transcript(transcript_path):
+    """
+    Analyze the newest turn of a transcript
+    Returns: AnalysisResult (raises OSError if the transcript can't be read)
+    """
+    return build_result(analyze_items(transcript_path))
+
+
+def iter_records(transcript_path):
+    """Yield decodable records of a whole transcript, front to back"""
+    with open(transcript_path, 'rb') as f:
+        for line in f:
+            if not should_decode(line):
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def analyze_session(transcript_path):
+    """
+    Analyze a whole transcript without touching hook state
+    (no checkpoint, no reported-items filtering) - used for batch reports
+    """
+    return build_result(extract_items(iter_records(transcript_path)))
+
+
+def format_markers(result):
+    """Format a result with the legacy START/END marker protocol"""
+    lines = []
+
+    # 사용자 명령 요약 출력 (최우선)
+    if result.summary:
+        lines += ["COMMAND_SUMMARY_START", result.summary, "COMMAND_SUMMARY_END"]
+
+    if result.todos:
+        lines += ["TODOS_START"] + result.todos + ["TODOS_END"]
+
+    if result.thinking:
+        lines += ["THINKING_START", f"• {result.thinking}", "THINKING_END"]
+
+    # Plan은 이미 잘 정리된 마크다운이므로 그대로 출력
+    if result.plan:
+        lines += ["PLAN_START", result.plan, "PLAN_END"]
+
+    return '\n'.join(lines)
+
+
+def main():
+    args = sys.argv[1:]
+    as_json = '--json' in args
+    paths = [arg for arg in args if arg != '--json']
+
+    if not paths:
+        print("ERROR: No transcript path provided", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        result = analyze_transcript(paths[0])
+    except Exception as e:
+        print(f"ERROR:{str(e)}", file=sys.stderr)
+        sys.exit(1)
+
+    if as_json:
+        print(json.dumps(result.to_dict(), ensure_ascii=False))
+    else:
+        output = format_markers(result)
+        if output:
+            print(output)
+
+
+if __name__ == '__main__':
+    main()
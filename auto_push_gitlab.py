@@ -2,109 +2,170 @@
 """
 Auto Push to GitLab Module
 Automatically commits and pushes changes to GitLab when file changes are detected
+
+Hooks run it with --stdin and pass the git snapshot they already took
+(git_snapshot.GitSnapshot as JSON), so the pusher doesn't re-run
+`git status` / `rev-parse` itself. A snapshot that ran out of time in
+the hook (large repositories) is retaken here with a longer budget.
+
+With GITLAB_STAGING_MODE=session (default) the hooks also pass the paths
+the session touched (session_paths.py) and only those of them that git
+reports as changed are staged and committed (`git commit -- <paths>`),
+leaving other local edits and anything the user staged alone. Run
+without a session (standalone) it commits everything as before.
+
+Commits are made on every run, but pushes go through push_queue.py: at
+most one `git push` per repository every GITLAB_PUSH_INTERVAL seconds
+from a background worker (0 = push right away). --flush (SessionEnd)
+pushes everything queued immediately; --flush-only does just that.
+The hook passes its Slack session on stdin ('notify'), and the worker
+posts the result of the queued push there.
+
+Staging and committing run under repo_lock.RepoLock, so parallel
+sessions committing into one repository take turns instead of deleting
+each other's (or the IDE's) .git/index.lock.
 """
+import json
 import os
 import sys
 import subprocess
-import tempfile
 from pathlib import Path
 from datetime import datetime
 
+from git_snapshot import SCAN_TIMEOUT, GitSnapshot, git_settings, take_snapshot
+from hook_config import load_config
+from hook_log import get_logger
+from push_queue import get_git_dir, push_pending, request_push
+from repo_lock import RepoLock, RepoLockTimeout, get_index_lock, wait_for_index_lock
 
-def log_debug(message):
-    """Write debug log"""
-    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    debug_log = Path(tempfile.gettempdir()) / 'claude-hook-debug.log'
-    try:
-        with open(debug_log, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] [GITLAB] {message}\n")
-    except:
-        pass
-
-
-def load_env_file(env_path):
-    """Load environment variables from .env file"""
-    env_vars = {}
-    if not os.path.exists(env_path):
-        return env_vars
-
-    with open(env_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                env_vars[key.strip()] = value.strip().strip('"').strip("'")
-    return env_vars
+log = get_logger('GITLAB')
 
 
-def is_git_repo():
-    """Check if current directory is a git repository"""
+def read_stdin_payload():
+    """
+    Snapshot, session paths and Slack notify target passed by the hook on stdin
+    Returns: (GitSnapshot or None, list of absolute paths or None, notify dict or None)
+    """
     try:
-        subprocess.run(
-            ['git', 'rev-parse', '--git-dir'],
-            capture_output=True,
-            check=True,
-            timeout=5
-        )
-        return True
-    except:
-        return False
-
-
-def has_changes():
-    """Check if there are uncommitted changes"""
+        data = json.loads(sys.stdin.read())
+    except ValueError:
+        return None, None, None
+    if not isinstance(data, dict):
+        return None, None, None
+    snapshot = data.get('snapshot')
+    return (GitSnapshot.from_dict(snapshot) if snapshot else None), data.get('session_paths'), data.get('notify')
+
+
+def get_change_summary(snapshot, paths=None):
+    """Get summary of file changes (only of `paths` if given)"""
+    changed = snapshot.changed_files() if paths is None else paths
+    new_files = set(snapshot.added + snapshot.untracked)
+    # 추적하지 않는 디렉토리는 스냅샷에 'dir/' 하나로만 나옴
+    untracked_dirs = tuple(path for path in snapshot.untracked if path.endswith('/'))
+    added = set(path for path in changed if path in new_files or path.startswith(untracked_dirs))
+    deleted = set(changed) & set(snapshot.deleted)
+    modified = [path for path in changed if path not in added and path not in deleted]
+
+    summary = []
+    if modified:
+        summary.append(f"수정: {len(modified)}개")
+    if added:
+        summary.append(f"추가: {len(added)}개")
+    if deleted:
+        summary.append(f"삭제: {len(deleted)}개")
+
+    return ', '.join(summary) if summary else '변경 없음'
+
+
+def get_toplevel():
+    """Root of the current git working tree (None on failure)"""
     try:
         result = subprocess.run(
-            ['git', 'status', '--porcelain'],
+            ['git', 'rev-parse', '--show-toplevel'],
             capture_output=True,
             text=True,
             timeout=5
         )
-        return len(result.stdout.strip()) > 0
-    except:
-        return False
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
 
 
-def get_change_summary():
-    """Get summary of file changes"""
+def list_new_files(toplevel, paths, settings):
+    """Untracked, not ignored files among paths (only needed when the snapshot skipped untracked files)"""
     try:
         result = subprocess.run(
-            ['git', 'status', '--short'],
+            ['git'] + settings['git_args'] + ['--literal-pathspecs', 'ls-files', '-z', '--others',
+                                               '--exclude-standard', '--'] + paths,
+            cwd=toplevel,
             capture_output=True,
-            text=True,
-            encoding='utf-8',
-            timeout=5
+            timeout=settings['timeout']
         )
+    except (OSError, subprocess.TimeoutExpired):
+        return []
+    if result.returncode != 0:
+        return []
+    return [path for path in result.stdout.decode('utf-8', errors='replace').split('\0') if path]
 
-        lines = result.stdout.strip().split('\n')
-        modified = []
-        added = []
-        deleted = []
-
-        for line in lines:
-            if not line:
-                continue
-            status = line[:2]
-            filename = line[3:].strip()
-
-            if 'M' in status:
-                modified.append(filename)
-            elif 'A' in status or '??' in status:
-                added.append(filename)
-            elif 'D' in status:
-                deleted.append(filename)
-
-        summary = []
-        if modified:
-            summary.append(f"수정: {len(modified)}개")
-        if added:
-            summary.append(f"추가: {len(added)}개")
-        if deleted:
-            summary.append(f"삭제: {len(deleted)}개")
-
-        return ', '.join(summary) if summary else '변경 없음'
-    except:
-        return '변경사항 확인 실패'
+
+def select_session_paths(snapshot, toplevel, session_paths, settings):
+    """
+    Repository-relative paths to commit: the session's paths that git reports as changed
+    Ignored files and paths outside the repository never match.
+    """
+    touched = []
+    for path in session_paths:
+        try:
+            relative = os.path.relpath(path, toplevel).replace(os.sep, '/')
+        except ValueError:
+            # Windows: 다른 드라이브
+            continue
+        if relative != '.' and not relative.startswith('../'):
+            touched.append(relative)
+
+    renamed = {}
+    for old_path, new_path in snapshot.renamed:
+        renamed[old_path] = new_path
+        renamed[new_path] = old_path
+    changed = snapshot.changed_files() + [old_path for old_path, new_path in snapshot.renamed]
+    changed_set = set(changed)
+    untracked_dirs = set(path for path in snapshot.untracked if path.endswith('/'))
+
+    selected = {}
+    unmatched = []
+    for path in touched:
+        if path in changed_set:
+            selected.setdefault(path)
+        elif any(parent in untracked_dirs for parent in parent_dirs(path)):
+            # 추적하지 않는 디렉토리 안의 새 파일
+            selected.setdefault(path)
+        else:
+            # 삭제/이동된 디렉토리: 그 아래의 변경 경로
+            prefix = path + '/'
+            inside = [entry for entry in changed if entry.startswith(prefix)]
+            for entry in inside:
+                selected.setdefault(entry)
+            if not inside:
+                unmatched.append(path)
+
+    # 이름 변경은 원래 경로와 새 경로를 함께 커밋
+    for path in list(selected):
+        if path in renamed:
+            selected.setdefault(renamed[path])
+
+    if not settings['untracked'] and unmatched:
+        # 스냅샷에 추적하지 않는 파일이 없으므로 새 파일은 git에 직접 확인
+        existing = [path for path in unmatched if os.path.exists(os.path.join(toplevel, path))]
+        if existing:
+            for path in list_new_files(toplevel, existing, settings):
+                selected.setdefault(path)
+    return list(selected)
+
+
+def parent_dirs(path):
+    """'a/b/c' -> ['a/', 'a/b/']"""
+    parts = path.split('/')[:-1]
+    return ['/'.join(parts[:index]) + '/' for index in range(1, len(parts) + 1)]
 
 
 def get_gitlab_remote():
@@ -136,60 +197,88 @@ def add_gitlab_remote(gitlab_url, remote_name='gitlab'):
             check=True,
             timeout=10
         )
-        log_debug(f"GitLab remote added: {remote_name} -> {gitlab_url}")
+        log.info(f"GitLab remote added: {remote_name} -> {gitlab_url}")
         return True
     except subprocess.CalledProcessError as e:
-        log_debug(f"Failed to add GitLab remote: {e.stderr.decode()}")
+        log.error(f"Failed to add GitLab remote: {e.stderr.decode()}")
         return False
 
 
-def remove_git_lock():
-    """Remove git index.lock if it exists"""
-    import os
-    lock_file = '.git/index.lock'
-    if os.path.exists(lock_file):
-        try:
-            os.remove(lock_file)
-            log_debug("Removed stale index.lock file")
-            return True
-        except Exception as e:
-            log_debug(f"Failed to remove index.lock: {str(e)}")
-            return False
-    return True
+def commit_changes(snapshot, commit_message=None, settings=None, paths=None, toplevel=None):
+    """
+    Commit changes with auto-generated message
+    paths: repository-relative paths to commit (relative to toplevel);
+           None = all changes (`git add -A`)
+    Holds the repository lock (repo_lock.py) while staging and committing;
+    gives up if another session or git keeps the repository busy.
+    """
+    if settings is None:
+        settings = git_settings()
+    git_dir = get_git_dir(toplevel)
+    if git_dir is None:
+        log.error("Commit failed: not a git repository")
+        return False
+    try:
+        # 같은 저장소에 커밋하는 다른 세션과 직렬화 (git 자신의 index.lock은 지우지 않고 기다림)
+        with RepoLock(git_dir, 'auto-commit'):
+            wait_for_index_lock(get_index_lock(toplevel))
+            return stage_and_commit(snapshot, commit_message, settings, paths, toplevel)
+    except RepoLockTimeout as e:
+        log.warning(f"Commit skipped, repository busy: {str(e)}")
+        return False
 
 
-def commit_changes(commit_message=None):
-    """Commit all changes with auto-generated message"""
+def stage_and_commit(snapshot, commit_message, settings, paths, toplevel):
+    """Stage and commit (call with the repository lock held)"""
+    git = ['git'] + settings['git_args']
     try:
-        # Remove stale lock file if exists
-        remove_git_lock()
-
-        # Add all changes
-        subprocess.run(
-            ['git', 'add', '-A'],
-            capture_output=True,
-            check=True,
-            timeout=10
-        )
+        if paths is None:
+            # Add all changes (대형 저장소에서 추적하지 않는 파일을 제외하도록 설정했으면 -u)
+            stage_commands = [['add', '-A' if settings['untracked'] else '-u']]
+            commit_paths = []
+        else:
+            # 세션 경로만 스테이징하고 커밋도 이 경로만 (사용자가 스테이징한 다른 변경은 그대로)
+            existing = [path for path in paths if os.path.lexists(os.path.join(toplevel, path))]
+            missing = [path for path in paths if path not in existing]
+            stage_commands = []
+            if existing:
+                stage_commands.append(['--literal-pathspecs', 'add', '-A', '--'] + existing)
+            if missing:
+                # 삭제된 경로 (이미 삭제가 스테이징됐으면 add는 pathspec 오류)
+                stage_commands.append(['--literal-pathspecs', 'rm', '--cached', '-r', '-q', '--ignore-unmatch',
+                                       '--'] + missing)
+            commit_paths = ['--'] + paths
+        for args in stage_commands:
+            subprocess.run(
+                git + args,
+                cwd=toplevel,
+                capture_output=True,
+                check=True,
+                timeout=SCAN_TIMEOUT
+            )
 
         # Generate commit message if not provided
         if not commit_message:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            summary = get_change_summary()
+            summary = get_change_summary(snapshot, paths)
             commit_message = f"Auto-commit: {summary} ({timestamp})"
 
         # Commit
         subprocess.run(
-            ['git', 'commit', '-m', commit_message],
+            git + ['--literal-pathspecs', 'commit', '-m', commit_message] + commit_paths,
+            cwd=toplevel,
             capture_output=True,
             check=True,
-            timeout=10
+            timeout=SCAN_TIMEOUT
         )
 
-        log_debug(f"Changes committed: {commit_message}")
+        log.info(f"Changes committed: {commit_message}")
         return True
     except subprocess.CalledProcessError as e:
-        log_debug(f"Commit failed: {e.stderr.decode()}")
+        log.error(f"Commit failed: {e.stderr.decode()}")
+        return False
+    except subprocess.TimeoutExpired as e:
+        log.error(f"Commit timed out: {' '.join(e.cmd)}")
         return False
 
 
@@ -216,16 +305,19 @@ def push_to_gitlab(remote_name='gitlab', branch=None):
         )
 
         if result.returncode == 0:
-            log_debug(f"Successfully pushed to {remote_name}/{branch}")
+            log.info(f"Successfully pushed to {remote_name}/{branch}")
             return True, f"Pushed to {remote_name}/{branch}"
         else:
             error_msg = result.stderr.strip()
-            log_debug(f"Push failed: {error_msg}")
+            log.error(f"Push failed: {error_msg}")
             return False, error_msg
     except subprocess.CalledProcessError as e:
         error_msg = e.stderr.decode() if e.stderr else str(e)
-        log_debug(f"Push error: {error_msg}")
+        log.error(f"Push error: {error_msg}")
         return False, error_msg
+    except subprocess.TimeoutExpired:
+        log.error(f"Push to {remote_name}/{branch} timed out")
+        return False, f"Push to {remote_name}/{branch} timed out"
 
 
 def run_gitlab_setup():
@@ -236,7 +328,7 @@ def run_gitlab_setup():
     setup_script = script_dir / 'setup_gitlab.py'
 
     if not setup_script.exists():
-        log_debug("Setup wizard not found")
+        log.warning("Setup wizard not found")
         return False
 
     try:
@@ -247,46 +339,84 @@ def run_gitlab_setup():
         )
         return result.returncode == 0
     except Exception as e:
-        log_debug(f"Setup wizard error: {str(e)}")
+        log.error(f"Setup wizard error: {str(e)}")
         return False
 
 
-def auto_push_to_gitlab(auto_setup=True):
+def flush_push_queue():
+    """
+    Push everything queued for the current repository now
+    Returns: (success: bool, message: str)
+    """
+    git_dir = get_git_dir()
+    if git_dir is None:
+        return False, "Not a git repository"
+    results = push_pending(git_dir)
+    if not results:
+        return False, "No queued pushes"
+    if all(success for success, _ in results):
+        return True, '\n'.join(f"✅ {message}" for _, message in results)
+    return False, '\n'.join(f"✅ {message}" if success else f"❌ Push failed: {message}"
+                             for success, message in results)
+
+
+def auto_push_to_gitlab(auto_setup=True, snapshot=None, session_paths=None, flush=False, notify=None):
     """
     Main function: Check for changes and auto-push to GitLab if enabled
     Args:
         auto_setup: If True, run setup wizard when GitLab is not configured
+        snapshot: GitSnapshot taken by the caller (None = take one now)
+        session_paths: absolute paths touched by the session (None = commit all changes)
+        flush: push right away, together with anything still queued (SessionEnd)
+        notify: Slack session the push worker reports a queued push to (push_queue.request_push)
     Returns: (success: bool, message: str)
     """
-    # Load environment variables
-    env_file = Path.home() / '.ultrathink.env'
-    env_vars = load_env_file(env_file)
+    # Load configuration (project .ultrathink.env may override)
+    config = load_config(os.getcwd())
 
     # Check if auto-push is enabled
-    auto_push_enabled = env_vars.get('GITLAB_AUTO_PUSH_ENABLED', 'false').lower() == 'true'
-
-    if not auto_push_enabled:
-        log_debug("GitLab auto-push disabled")
+    if not config['GITLAB_AUTO_PUSH_ENABLED']:
+        log.debug("GitLab auto-push disabled")
         return False, "GitLab auto-push disabled"
 
     # Check if in git repository
-    if not is_git_repo():
-        log_debug("Not a git repository")
+    # (Hook에서 시간 초과로 부분 스냅샷만 얻었다면 더 긴 제한 시간으로 다시 찍음)
+    settings = git_settings(os.getcwd(), config)
+    if snapshot is None or snapshot.partial is not None:
+        snapshot = take_snapshot(settings=dict(settings, timeout=SCAN_TIMEOUT))
+    if snapshot is None:
+        log.debug("Not a git repository")
         return False, "Not a git repository"
 
     # Check for changes
-    if not has_changes():
-        log_debug("No file changes detected")
-        return False, "No changes to push"
+    if snapshot.partial is not None:
+        log.warning("git status timed out, push skipped")
+        return False, "❌ Push skipped: git status timed out"
+    if not snapshot.has_changes:
+        log.debug("No file changes detected")
+        return flush_push_queue() if flush else (False, "No changes to push")
+
+    # Session-scoped staging: 세션이 건드린 경로 중 변경된 것만
+    paths = None
+    toplevel = None
+    if session_paths is not None and config['GITLAB_STAGING_MODE'] == 'session':
+        toplevel = get_toplevel()
+        if toplevel is None:
+            return False, "❌ Push skipped: git toplevel not found"
+        paths = select_session_paths(snapshot, toplevel, session_paths, settings)
+        if not paths:
+            log.debug("No session changes detected")
+            return flush_push_queue() if flush else (False, "No session changes to push")
+        log.debug(f"Session-scoped staging: {len(paths)} path(s)")
 
     # Get GitLab configuration
-    gitlab_url = env_vars.get('GITLAB_REPO_URL', '').strip()
-    gitlab_token = env_vars.get('GITLAB_ACCESS_TOKEN', '').strip()
-    remote_name = env_vars.get('GITLAB_REMOTE_NAME', 'gitlab')
+    gitlab_url = config['GITLAB_REPO_URL']
+    gitlab_token = config['GITLAB_ACCESS_TOKEN']
+    remote_name = config['GITLAB_REMOTE_NAME']
 
     # If GitLab URL not configured, offer to run setup
     if not gitlab_url:
-        log_debug("GitLab URL not configured")
+        log.warning("GitLab URL not configured")
 
         if auto_setup and sys.stdin.isatty():
             # Interactive terminal - run setup wizard
@@ -297,9 +427,9 @@ def auto_push_to_gitlab(auto_setup=True):
             if response != 'n':
                 if run_gitlab_setup():
                     # Reload environment variables after setup
-                    env_vars = load_env_file(env_file)
-                    gitlab_url = env_vars.get('GITLAB_REPO_URL', '').strip()
-                    gitlab_token = env_vars.get('GITLAB_ACCESS_TOKEN', '').strip()
+                    config = load_config(os.getcwd())
+                    gitlab_url = config['GITLAB_REPO_URL']
+                    gitlab_token = config['GITLAB_ACCESS_TOKEN']
 
                     if not gitlab_url:
                         return False, "Setup incomplete - GitLab URL still not set"
@@ -328,23 +458,41 @@ def auto_push_to_gitlab(auto_setup=True):
         current_remote = remote_name
 
     # Commit changes
-    commit_message = env_vars.get('GITLAB_AUTO_COMMIT_MESSAGE')
-    if not commit_changes(commit_message):
+    commit_message = config['GITLAB_AUTO_COMMIT_MESSAGE']
+    if not commit_changes(snapshot, commit_message, settings, paths, toplevel):
         return False, "Failed to commit changes"
 
-    # Push to GitLab
-    success, message = push_to_gitlab(current_remote)
+    # Push to GitLab (디바운스 큐: 여러 턴의 커밋을 한 번에 푸시)
+    if not snapshot.branch:
+        return False, "❌ Push skipped: detached HEAD"
+    git_dir = get_git_dir()
+    if git_dir is None:
+        return False, "❌ Push skipped: git directory not found"
+    push_now = flush or config['GITLAB_PUSH_INTERVAL'] == 0
+    due, last_result = request_push(git_dir, current_remote, snapshot.branch, config['GITLAB_PUSH_INTERVAL'],
+                                    start_worker=not push_now, notify=notify)
+    if push_now:
+        success, message = flush_push_queue()
+        if success:
+            log.info(f"Auto-push completed: {message}")
+        else:
+            log.warning(f"Auto-push failed: {message}")
+        return success, message
 
-    if success:
-        log_debug(f"Auto-push completed: {message}")
-        return True, f"✅ {message}"
-    else:
-        log_debug(f"Auto-push failed: {message}")
-        return False, f"❌ Push failed: {message}"
+    message = f"🕒 Committed, push to {current_remote}/{snapshot.branch} queued (in {due}s)"
+    if last_result and not last_result['ok']:
+        message += f"\n⚠️ Last push failed: {last_result['messages'][-1]}"
+    log.info(message)
+    return True, message
 
 
 if __name__ == '__main__':
     # Can be called standalone for testing
-    success, message = auto_push_to_gitlab()
+    if '--flush-only' in sys.argv:
+        success, message = flush_push_queue()
+    else:
+        snapshot, session_paths, notify = read_stdin_payload() if '--stdin' in sys.argv else (None, None, None)
+        success, message = auto_push_to_gitlab(snapshot=snapshot, session_paths=session_paths,
+                                               flush='--flush' in sys.argv, notify=notify)
     print(message)
     sys.exit(0 if success else 1)
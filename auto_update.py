@@ -3,38 +3,16 @@
 Auto Update Module for Claude Code Hooks
 Automatically checks and updates hooks from GitHub repository
 """
-import os
 import sys
 import subprocess
 import time
 import shutil
 from pathlib import Path
 
+from hook_config import load_config
+from hook_log import get_logger
 
-def log_debug(message):
-    """Write debug log"""
-    timestamp = time.strftime('%Y-%m-%d %H:%M:%S')
-    debug_log = Path('/tmp') / 'claude-hook-debug.log'
-    try:
-        with open(debug_log, 'a', encoding='utf-8') as f:
-            f.write(f"[{timestamp}] [AUTO_UPDATE] {message}\n")
-    except:
-        pass
-
-
-def load_env_file(env_path):
-    """Load environment variables from .env file"""
-    env_vars = {}
-    if not os.path.exists(env_path):
-        return env_vars
-
-    with open(env_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                env_vars[key.strip()] = value.strip().strip('"').strip("'")
-    return env_vars
+log = get_logger('AUTO_UPDATE')
 
 
 def should_check_update(hooks_dir, check_interval):
@@ -52,7 +30,7 @@ def should_check_update(hooks_dir, check_interval):
         elapsed = current_time - last_check
 
         if elapsed < check_interval:
-            log_debug(f"Update check skipped ({elapsed}s ago, interval: {check_interval}s)")
+            log.debug(f"Update check skipped ({elapsed}s ago, interval: {check_interval}s)")
             return False
 
         return True
@@ -93,7 +71,14 @@ def has_local_changes(hooks_dir):
 
 def backup_hook_files(hooks_dir):
     """Backup hook files before update"""
-    hook_files = ['SessionStart', 'SessionEnd', 'Stop', 'Notification', 'analyze_transcript.py']
+    hook_files = [
+        'SessionStart', 'SessionEnd', 'Stop', 'Notification',
+        'analyze_transcript.py', 'analysis_cache.py', 'reported_store.py',
+        'keyword_rules.py', 'classify_rules.json', 'batch_analyze.py',
+        'hook_daemon.py', 'slack_outbox.py', 'slack_client.py', 'digest_store.py',
+        'hook_config.py', 'hook_trace.py', 'hook_log.py', 'file_lock.py', 'hook_report.py',
+        'git_snapshot.py', 'session_paths.py', 'push_queue.py', 'repo_lock.py'
+    ]
     backup_dir = hooks_dir / '.backup'
 
     try:
@@ -105,10 +90,10 @@ def backup_hook_files(hooks_dir):
                 dst = backup_dir / filename
                 shutil.copy2(src, dst)
 
-        log_debug("Backup created successfully")
+        log.info("Backup created successfully")
         return True
     except Exception as e:
-        log_debug(f"Backup failed: {str(e)}")
+        log.error(f"Backup failed: {str(e)}")
         return False
 
 
@@ -125,10 +110,10 @@ def restore_from_backup(hooks_dir):
                 dst = hooks_dir / backup_file.name
                 shutil.copy2(backup_file, dst)
 
-        log_debug("Restored from backup")
+        log.info("Restored from backup")
         return True
     except Exception as e:
-        log_debug(f"Restore failed: {str(e)}")
+        log.error(f"Restore failed: {str(e)}")
         return False
 
 
@@ -144,7 +129,7 @@ def fetch_updates(hooks_dir):
         )
 
         if result.returncode != 0:
-            log_debug(f"Git fetch failed: {result.stderr}")
+            log.warning(f"Git fetch failed: {result.stderr}")
             return False
 
         # Check if there are new commits
@@ -159,7 +144,7 @@ def fetch_updates(hooks_dir):
         new_commits = int(result.stdout.strip())
         return new_commits > 0
     except Exception as e:
-        log_debug(f"Fetch error: {str(e)}")
+        log.warning(f"Fetch error: {str(e)}")
         return False
 
 
@@ -175,20 +160,20 @@ def pull_updates(hooks_dir):
         )
 
         if result.returncode != 0:
-            log_debug(f"Git pull failed: {result.stderr}")
+            log.error(f"Git pull failed: {result.stderr}")
             return False, result.stderr
 
-        log_debug("Git pull successful")
+        log.info("Git pull successful")
         return True, result.stdout
     except Exception as e:
-        log_debug(f"Pull error: {str(e)}")
+        log.error(f"Pull error: {str(e)}")
         return False, str(e)
 
 
-def send_update_notification(env_vars, success, message):
+def send_update_notification(config, success, message):
     """Send update notification to Slack"""
-    slack_token = env_vars.get('SLACK_BOT_TOKEN')
-    slack_channel = env_vars.get('SLACK_CHANNEL_ID', 'C09J29WDSHK')
+    slack_token = config['SLACK_BOT_TOKEN']
+    slack_channel = config['SLACK_CHANNEL_ID']
 
     if not slack_token:
         return
@@ -246,33 +231,30 @@ def check_and_update():
     """Main auto-update function"""
     hooks_dir = Path.home() / '.claude-hooks'
 
-    # Load environment variables
-    env_file = Path.home() / '.ultrathink.env'
-    env_vars = load_env_file(env_file)
+    # Load configuration
+    config = load_config()
 
     # Check if auto-update is enabled
-    auto_update_enabled = env_vars.get('AUTO_UPDATE_ENABLED', 'true').lower() == 'true'
-
-    if not auto_update_enabled:
-        log_debug("Auto-update disabled")
+    if not config['AUTO_UPDATE_ENABLED']:
+        log.debug("Auto-update disabled")
         return
 
     # Check if it's a git repository
     if not is_git_repo(hooks_dir):
-        log_debug("Not a git repository, skipping update")
+        log.debug("Not a git repository, skipping update")
         return
 
     # Check update interval
-    check_interval = int(env_vars.get('UPDATE_CHECK_INTERVAL', '86400'))  # Default: 24 hours
+    check_interval = config['UPDATE_CHECK_INTERVAL']
 
     if not should_check_update(hooks_dir, check_interval):
         return
 
-    log_debug("Starting update check...")
+    log.info("Starting update check...")
 
     # Check for local changes
     if has_local_changes(hooks_dir):
-        log_debug("Local changes detected, skipping update")
+        log.warning("Local changes detected, skipping update")
         record_check_time(hooks_dir)  # Record anyway to avoid repeated checks
         return
 
@@ -280,15 +262,15 @@ def check_and_update():
     has_updates = fetch_updates(hooks_dir)
 
     if not has_updates:
-        log_debug("No updates available")
+        log.info("No updates available")
         record_check_time(hooks_dir)
         return
 
-    log_debug("Updates available, starting pull...")
+    log.info("Updates available, starting pull...")
 
     # Backup before update
     if not backup_hook_files(hooks_dir):
-        log_debug("Backup failed, aborting update")
+        log.error("Backup failed, aborting update")
         record_check_time(hooks_dir)
         return
 
@@ -296,12 +278,12 @@ def check_and_update():
     success, output = pull_updates(hooks_dir)
 
     if success:
-        log_debug("Update successful")
-        send_update_notification(env_vars, True, output)
+        log.info("Update successful")
+        send_update_notification(config, True, output)
     else:
-        log_debug("Update failed, restoring backup")
+        log.error("Update failed, restoring backup")
         restore_from_backup(hooks_dir)
-        send_update_notification(env_vars, False, output)
+        send_update_notification(config, False, output)
 
     # Record check time
     record_check_time(hooks_dir)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Batch Transcript Analyzer
+Analyzes every transcript under a directory in parallel for team reporting
+
+Per-session results are streamed to stdout as NDJSON, followed by one
+aggregate line. Files whose (size, mtime) match the manifest from the
+previous run are not re-analyzed; their cached results still count
+toward the aggregate.
+
+Usage:
+    batch_analyze.py [DIR] [--workers N] [--manifest FILE] [--all]
+    (DIR defaults to ~/.claude/projects)
+"""
+import argparse
+import json
+import os
+import sys
+from collections import Counter
+from multiprocessing import Pool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+from analyze_transcript import analyze_session
+
+DEFAULT_ROOT = Path.home() / '.claude' / 'projects'
+DEFAULT_MANIFEST = Path.home() / '.claude' / 'hooks-batch-manifest.json'
+
+
+def find_transcripts(root):
+    """Yield (path, size, mtime) for every .jsonl file under root"""
+    for dirpath, dirnames, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith('.jsonl'):
+                path = os.path.join(dirpath, filename)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime_ns
+
+
+def load_manifest(manifest_path):
+    """Load {path: {size, mtime, result}} from the previous run"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path, manifest):
+    """Atomically write the manifest"""
+    manifest_path = Path(manifest_path)
+    manifest_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = manifest_path.with_name(f"{manifest_path.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_file, manifest_path)
+
+
+def analyze_one(job):
+    """Worker: analyze one transcript (runs in a pool process)"""
+    path, size, mtime = job
+    try:
+        result = analyze_session(path).to_dict()
+        error = None
+    except Exception as e:
+        result = None
+        error = str(e)
+    return path, size, mtime, result, error
+
+
+def session_record(path, result):
+    """Build the NDJSON record of one session"""
+    record = {
+        'type': 'session',
+        'session_id': Path(path).stem,
+        'project': Path(path).parent.name,
+        'path': path,
+    }
+    record.update(result)
+    return record
+
+
+def aggregate(manifest):
+    """Aggregate cached results of all sessions"""
+    files = Counter()
+    summaries = Counter()
+    projects = Counter()
+    total_commands = 0
+    total_todos = 0
+
+    for path, entry in manifest.items():
+        result = entry.get('result')
+        if not result:
+            continue
+        projects[Path(path).parent.name] += 1
+        summaries[result.get('summary', '')] += 1
+        files.update(result.get('files', []))
+        total_commands += len(result.get('commands', []))
+        total_todos += len(result.get('todos', []))
+
+    return {
+        'type': 'aggregate',
+        'sessions': sum(projects.values()),
+        'projects': dict(projects.most_common()),
+        'files_modified': len(files),
+        'commands': total_commands,
+        'todos': total_todos,
+        'top_files': [path for path, count in files.most_common(10)],
+        'top_summaries': [summary for summary, count in summaries.most_common(10) if summary],
+    }
+
+
+def emit(record):
+    print(json.dumps(record, ensure_ascii=False), flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Analyze all Claude Code transcripts under a directory')
+    parser.add_argument('root', nargs='?', default=str(DEFAULT_ROOT), help='transcript directory')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='process pool size')
+    parser.add_argument('--manifest', default=str(DEFAULT_MANIFEST), help='manifest file for skipping unchanged files')
+    parser.add_argument('--all', action='store_true', help='also emit unchanged (cached) sessions')
+    args = parser.parse_args()
+
+    old_manifest = load_manifest(args.manifest)
+    manifest = {}
+    jobs = []
+    skipped = 0
+
+    for path, size, mtime in find_transcripts(args.root):
+        entry = old_manifest.get(path)
+        if entry and entry.get('size') == size and entry.get('mtime') == mtime:
+            manifest[path] = entry
+            skipped += 1
+            if args.all and entry.get('result'):
+                emit(session_record(path, entry['result']))
+        else:
+            jobs.append((path, size, mtime))
+
+    if jobs:
+        # 큰 파일부터 시작해 마지막에 긴 작업이 남지 않도록
+        jobs.sort(key=lambda job: job[1], reverse=True)
+        with Pool(max(1, args.workers)) as pool:
+            for path, size, mtime, result, error in pool.imap_unordered(analyze_one, jobs, chunksize=4):
+                if error:
+                    emit({'type': 'error', 'path': path, 'error': error})
+                    continue
+                manifest[path] = {'size': size, 'mtime': mtime, 'result': result}
+                emit(session_record(path, result))
+
+    save_manifest(args.manifest, manifest)
+
+    summary = aggregate(manifest)
+    summary['analyzed'] = len(jobs)
+    summary['skipped'] = skipped
+    emit(summary)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Analyzer Benchmark Suite
+Measures wall time, peak RSS and lines/s of the transcript analyzer
+
+Each measurement runs in a fresh interpreter so peak RSS is per run.
+lines/s counts the lines the analyzer actually read: the whole file in
+session mode, only the scanned tail (the last turn) in hook mode.
+Modes:
+    hook     - analyze_transcript() as the Stop hook calls it (fresh state)
+    session  - analyze_session() as batch_analyze.py calls it (whole file)
+
+Usage:
+    bench_analyzer.py [--sizes 1000,100000,1000000] [--save FILE] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).parent
+REPO_DIR = BENCH_DIR.parent
+DEFAULT_SIZES = [1000, 100000, 1000000]
+MODES = ['hook', 'session']
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB (None if unsupported)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS는 bytes, Linux는 KiB
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_once(mode, transcript_path):
+    """Child process: run one analysis and print measurements as JSON"""
+    sys.path.insert(0, str(REPO_DIR))
+    import analyze_transcript as analyzer
+
+    # hook 모드는 첫 Stop과 같은 조건 (체크포인트/보고 이력 없음)
+    for state_file in analyzer.get_state_files(transcript_path):
+        if os.path.exists(state_file):
+            os.remove(state_file)
+
+    # hook 모드는 파일 끝에서 읽은 줄만 셈 (전체 줄 수로 나누면 처리량이 부풀려짐)
+    lines_read = [0]
+    iter_lines_reverse = analyzer.iter_lines_reverse
+
+    def counting_iter_lines_reverse(*args, **kwargs):
+        for item in iter_lines_reverse(*args, **kwargs):
+            lines_read[0] += 1
+            yield item
+
+    analyzer.iter_lines_reverse = counting_iter_lines_reverse
+
+    start = time.perf_counter()
+    if mode == 'hook':
+        analyzer.analyze_transcript(transcript_path)
+    else:
+        analyzer.analyze_session(transcript_path)
+    wall = time.perf_counter() - start
+
+    for state_file in analyzer.get_state_files(transcript_path):
+        if os.path.exists(state_file):
+            os.remove(state_file)
+
+    data = {'wall_s': wall, 'peak_rss_kb': peak_rss_kb()}
+    if mode == 'hook':
+        data['lines_read'] = lines_read[0]
+    print(json.dumps(data))
+
+
+def ensure_transcript(work_dir, lines, seed):
+    """Generate (or reuse) a synthetic transcript with `lines` lines"""
+    path = Path(work_dir) / f"bench-{lines}-{seed}.jsonl"
+    if not path.exists():
+        subprocess.run(
+            [sys.executable, str(BENCH_DIR / 'generate_transcript.py'), str(path),
+             '--lines', str(lines), '--seed', str(seed)],
+            check=True,
+            stdout=subprocess.DEVNULL
+        )
+    return path
+
+
+def measure(mode, path, lines):
+    """Run one measurement in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, __file__, '--run', mode, str(path)],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    data = json.loads(result.stdout)
+    # session 모드는 파일 전체를 읽음
+    lines_read = data.setdefault('lines_read', lines)
+    data.update({
+        'mode': mode,
+        'lines': lines,
+        'bytes': path.stat().st_size,
+        'lines_per_s': round(lines_read / data['wall_s']) if data['wall_s'] > 0 else None,
+    })
+    return data
+
+
+def compare(results, baseline_path, max_regression):
+    """Print ratios against a baseline; returns True if within limits"""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = {(r['mode'], r['lines']): r for r in json.load(f)['results']}
+
+    ok = True
+    for r in results:
+        base = baseline.get((r['mode'], r['lines']))
+        if not base:
+            continue
+        ratio = r['wall_s'] / base['wall_s'] if base['wall_s'] else 0
+        flag = 'REGRESSION' if ratio > max_regression else 'ok'
+        if ratio > max_regression:
+            ok = False
+        print(f"  {r['mode']:8} {r['lines']:>9} lines  {base['wall_s']:.3f}s -> {r['wall_s']:.3f}s  x{ratio:.2f}  {flag}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the transcript analyzer')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)), help='comma-separated line counts')
+    parser.add_argument('--modes', default=','.join(MODES), help='comma-separated modes')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'claude-hooks-bench'))
+    parser.add_argument('--save', help='write results as a JSON baseline')
+    parser.add_argument('--compare', help='compare with a JSON baseline')
+    parser.add_argument('--max-regression', type=float, default=1.25, help='allowed wall time ratio vs baseline')
+    parser.add_argument('--run', nargs=2, metavar=('MODE', 'PATH'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_once(*args.run)
+        return
+
+    os.makedirs(args.work_dir, exist_ok=True)
+    results = []
+    for lines in [int(size) for size in args.sizes.split(',')]:
+        path = ensure_transcript(args.work_dir, lines, args.seed)
+        for mode in args.modes.split(','):
+            r = measure(mode, path, lines)
+            results.append(r)
+            print(f"{mode:8} {lines:>9} lines {r['bytes'] / 1e6:8.1f} MB  "
+                  f"{r['wall_s']:8.3f}s  {r['peak_rss_kb'] or 0:>8} KiB  {r['lines_read']:>9} read  "
+                  f"{r['lines_per_s'] or 0:>10} lines/s")
+
+    if args.save:
+        report = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'results': results,
+        }
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+        print(f"Baseline saved: {args.save}")
+
+    if args.compare:
+        print(f"Compared with {args.compare}:")
+        if not compare(results, args.compare, args.max_regression):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
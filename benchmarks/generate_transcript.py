@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Synthetic Transcript Generator
+Writes realistic Claude Code JSONL transcripts for analyzer benchmarks
+
+Usage:
+    generate_transcript.py OUTPUT --lines N [--seed S] [--thinking-size N]
+                           [--payload-size N] [--payload-rate R] [--turn-length N]
+"""
+import argparse
+import json
+import random
+import uuid
+from datetime import datetime, timedelta
+
+# 도구 사용 비율 (이름, 가중치)
+DEFAULT_TOOL_MIX = [
+    ('Read', 30), ('Bash', 20), ('Edit', 15), ('Grep', 10), ('TodoWrite', 8),
+    ('Write', 5), ('Glob', 5), ('MultiEdit', 3), ('Task', 2), ('ExitPlanMode', 1),
+    ('NotebookEdit', 1),
+]
+
+KOREAN_REQUESTS = [
+    "GitLab 저장소에 자동 푸시 기능을 추가해 주세요",
+    "Hook이 팀원 환경에서 작동 안돼요 확인 부탁드립니다",
+    "프로젝트 구조를 분석하고 개선점을 정리해줘",
+    "한글이 깨지는 문제 encoding 수정해 주세요",
+    "README 문서를 팀원용으로 작성해 주세요",
+    "테스트 코드 추가하고 전체 테스트 실행해줘",
+    "중복 메시지 전송되는 버그 고쳐줘",
+    "Please review the install script for all environments",
+]
+
+KOREAN_WORDS = "분석 결과 파일 수정 완료 확인 필요 설정 구조 변경 테스트 작업 코드 함수 모듈 환경 배포".split()
+ENGLISH_WORDS = "the analyzer reads transcript lines and extracts todos files commands plan thinking".split()
+
+BASH_COMMANDS = [
+    ("git status", "Show working tree status"),
+    ("git commit -m 'update'", "Commit changes"),
+    ("python -m pytest -q", "Run tests"),
+    ("npm run build", "Build project"),
+    ("ls -la", "List files"),
+]
+
+
+def random_text(rng, words):
+    """Return random mixed Korean/English text of about `words` words"""
+    pool = KOREAN_WORDS + ENGLISH_WORDS
+    return ' '.join(rng.choice(pool) for _ in range(words))
+
+
+class TranscriptWriter:
+    """Writes records with chained uuids and increasing timestamps"""
+
+    def __init__(self, f, rng, session_id):
+        self.f = f
+        self.rng = rng
+        self.session_id = session_id
+        self.parent = None
+        self.time = datetime(2025, 1, 1, 9, 0, 0)
+        self.lines = 0
+
+    def write(self, role, content, record_type=None):
+        record_uuid = str(uuid.UUID(int=self.rng.getrandbits(128)))
+        self.time += timedelta(seconds=1)
+        record = {
+            'parentUuid': self.parent,
+            'isSidechain': False,
+            'userType': 'external',
+            'cwd': '/home/dev/project',
+            'sessionId': self.session_id,
+            'version': '1.0.0',
+            'type': record_type or role,
+            'message': {'role': role, 'content': content},
+            'uuid': record_uuid,
+            'timestamp': self.time.isoformat() + 'Z',
+        }
+        self.f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')))
+        self.f.write('\n')
+        self.parent = record_uuid
+        self.lines += 1
+
+
+def tool_input(rng, name, args):
+    """Build a realistic input payload for a tool call"""
+    path = f"/home/dev/project/src/module_{rng.randint(1, 200)}.py"
+    if name in ('Read', 'Edit', 'Write', 'MultiEdit'):
+        data = {'file_path': path}
+        if name == 'Edit':
+            data.update(old_string=random_text(rng, 20), new_string=random_text(rng, 25))
+        elif name == 'Write':
+            data['content'] = random_text(rng, 300)
+        elif name == 'MultiEdit':
+            data['edits'] = [{'old_string': random_text(rng, 10), 'new_string': random_text(rng, 12)}]
+        return data
+    if name == 'NotebookEdit':
+        return {'notebook_path': path.replace('.py', '.ipynb'), 'new_source': random_text(rng, 30)}
+    if name == 'Bash':
+        cmd, desc = rng.choice(BASH_COMMANDS)
+        return {'command': cmd, 'description': desc}
+    if name == 'TodoWrite':
+        statuses = ['pending', 'in_progress', 'completed']
+        return {'todos': [
+            {'content': f"{random_text(rng, 4)} 작업 {rng.randint(1, 50)}", 'status': rng.choice(statuses)}
+            for _ in range(rng.randint(2, 6))
+        ]}
+    if name == 'Task':
+        return {'description': random_text(rng, 4), 'prompt': random_text(rng, 60), 'subagent_type': 'general-purpose'}
+    if name == 'ExitPlanMode':
+        return {'plan': '## 계획\n' + '\n'.join(f"- {random_text(rng, 8)}" for _ in range(5))}
+    return {'pattern': random_text(rng, 2)}
+
+
+def generate(path, args):
+    """Generate a transcript with exactly args.lines lines"""
+    rng = random.Random(args.seed)
+    tools, weights = zip(*DEFAULT_TOOL_MIX)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        w = TranscriptWriter(f, rng, str(uuid.UUID(int=rng.getrandbits(128))))
+        turn_left = 0
+
+        while w.lines < args.lines:
+            if turn_left <= 0:
+                w.write('user', rng.choice(KOREAN_REQUESTS))
+                turn_left = rng.randint(args.turn_length // 2, args.turn_length * 3 // 2)
+                continue
+
+            blocks = []
+            if rng.random() < 0.3:
+                blocks.append({'type': 'thinking', 'thinking': random_text(rng, args.thinking_size // 6), 'signature': 'sig'})
+            if rng.random() < 0.5:
+                blocks.append({'type': 'text', 'text': random_text(rng, 30)})
+            name = rng.choices(tools, weights)[0]
+            tool_id = f"toolu_{rng.getrandbits(64):016x}"
+            blocks.append({'type': 'tool_use', 'id': tool_id, 'name': name, 'input': tool_input(rng, name, args)})
+            w.write('assistant', blocks)
+            turn_left -= 1
+
+            if w.lines >= args.lines:
+                break
+
+            # 도구 결과 (가끔 거대한 파일 내용 포함)
+            if rng.random() < args.payload_rate:
+                output = random_text(rng, args.payload_size // 6)
+            else:
+                output = random_text(rng, 40)
+            w.write('user', [{'tool_use_id': tool_id, 'type': 'tool_result', 'content': output}])
+            turn_left -= 1
+
+    return w.lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Generate a synthetic Claude Code transcript')
+    parser.add_argument('output', help='output .jsonl path')
+    parser.add_argument('--lines', type=int, default=1000, help='number of JSONL lines')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--thinking-size', type=int, default=2000, help='approx. bytes per thinking block')
+    parser.add_argument('--payload-size', type=int, default=1024 * 1024, help='approx. bytes of a giant tool_result')
+    parser.add_argument('--payload-rate', type=float, default=0.002, help='fraction of tool_results that are giant')
+    parser.add_argument('--turn-length', type=int, default=40, help='average lines per turn')
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    lines = generate(args.output, args)
+    print(f"Wrote {lines} lines to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
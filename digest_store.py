@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Digest Store Module
+Accumulates per-turn Stop results and sends them as periodic summaries
+
+In digest mode (SLACK_MESSAGE_MODE=digest) the Stop hook records each
+turn here instead of posting it. A session's turns are flushed as one
+aggregated Slack message when its oldest turn is older than the digest
+window, when it reaches the turn limit, when the rendered digest gets
+close to Slack's section size limit, or when the session ends.
+Messages go through the durable outbox.
+
+Each session keeps the Slack token, channel and digest limits it was
+recorded with (the project's .ultrathink.env may set its own channel),
+so a flush triggered from another project or the daemon still posts it
+where it belongs. The first turn of a window starts one detached
+flusher that sends the digest when the window ends, even if no other
+hook runs by then.
+
+Usage:
+    digest_store.py flush             # send digests that are due
+    digest_store.py flush --wait N    # wait N seconds, then send due digests
+"""
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from hook_log import get_logger
+from hook_report import build_message_payload
+from slack_outbox import post_message
+
+DEFAULT_DB = Path(__file__).parent / 'outbox' / 'digest.db'
+# Slack section 텍스트 제한 (3000자) 이전에 조기 전송
+MAX_DIGEST_CHARS = 2800
+# format_todos() 줄: "✅ 내용" 또는 "1. ✅ 내용"
+TODO_LINE = re.compile(r'^(?:\d+\. )?(\S+) (.+)$')
+# 창이 끝난 직후에 깨어나도록 더하는 여유 (초)
+FLUSH_MARGIN = 1
+
+log = get_logger('DIGEST')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS turns (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    work_dir TEXT NOT NULL,
+    created REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS turns_session ON turns (session, id);
+CREATE TABLE IF NOT EXISTS sessions (
+    session TEXT PRIMARY KEY,
+    token TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    digest_window INTEGER NOT NULL,
+    max_turns INTEGER NOT NULL
+);
+"""
+
+
+class DigestStore:
+    """SQLite store of turns waiting to be summarized"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not self.path.exists():
+                # 토큰이 저장되므로 소유자만 읽을 수 있게 생성
+                os.close(os.open(str(self.path), os.O_CREAT | os.O_WRONLY, 0o600))
+            self.conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def add_turn(self, session, work_dir, turn, config):
+        """
+        Record a turn with the session's Slack settings from config
+        Returns: True if it is the first turn of a new digest window
+        """
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            first = conn.execute("SELECT 1 FROM turns WHERE session = ? LIMIT 1", (session,)).fetchone() is None
+            conn.execute(
+                "INSERT INTO turns (session, work_dir, created, data) VALUES (?, ?, ?, ?)",
+                (session, work_dir, time.time(), json.dumps(turn, ensure_ascii=False))
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session, token, channel, digest_window, max_turns) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (session, config['SLACK_BOT_TOKEN'], config['SLACK_CHANNEL_ID'],
+                 config['SLACK_DIGEST_WINDOW'], config['SLACK_DIGEST_MAX_TURNS'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return first
+
+    def get_turns(self, session):
+        rows = self.connect().execute(
+            "SELECT work_dir, created, data FROM turns WHERE session = ? ORDER BY id", (session,)
+        ).fetchall()
+        return [(work_dir, created, json.loads(data)) for work_dir, created, data in rows]
+
+    def take_turns(self, session):
+        """
+        Atomically remove and return all turns of a session
+        Returns: (turns, (token, channel)) - settings are None for turns recorded without them
+        """
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT id, work_dir, created, data FROM turns WHERE session = ? ORDER BY id", (session,)
+            ).fetchall()
+            settings = conn.execute(
+                "SELECT token, channel FROM sessions WHERE session = ?", (session,)
+            ).fetchone()
+            if rows:
+                conn.execute("DELETE FROM turns WHERE session = ? AND id <= ?", (session, rows[-1][0]))
+            conn.execute("DELETE FROM sessions WHERE session = ?", (session,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(work_dir, created, json.loads(data)) for _, work_dir, created, data in rows], settings
+
+    def due_sessions(self, window, max_turns):
+        """
+        Sessions whose oldest turn is older than their window or that hit their turn limit
+        window/max_turns apply to sessions recorded without their own settings
+        """
+        rows = self.connect().execute(
+            "SELECT t.session, MIN(t.created), COUNT(*), s.digest_window, s.max_turns "
+            "FROM turns t LEFT JOIN sessions s ON s.session = t.session GROUP BY t.session"
+        ).fetchall()
+        now = time.time()
+        due = []
+        for session, oldest, count, session_window, session_max in rows:
+            if session_window is None:
+                session_window, session_max = window, max_turns
+            if oldest + session_window <= now or count >= session_max:
+                due.append(session)
+        return due
+
+
+def render_digest(turns):
+    """
+    Build the digest message from recorded turns
+    Returns: (title, message)
+    """
+    todos = {}
+    files = []
+    turn_lines = []
+
+    for work_dir, created, turn in turns:
+        time_text = datetime.fromtimestamp(created).strftime('%H:%M')
+        turn_lines.append(f"• {time_text} {turn.get('summary') or '작업 완료'}")
+        # 같은 할 일은 가장 최근 상태로 표시 (파일 목록 줄은 아래에서 따로 집계)
+        for line in turn.get('todos', []):
+            match = TODO_LINE.match(line)
+            if match and match.group(1) != '📝':
+                todos[match.group(2)] = f"{match.group(1)} {match.group(2)}"
+        for path in turn.get('files', []):
+            if path not in files:
+                files.append(path)
+
+    last_turn = turns[-1][2]
+    parts = [f"*턴 {len(turns)}개:*\n" + '\n'.join(turn_lines)]
+    if todos:
+        parts.append("\n📋 *작업 내역:*\n" + '\n'.join(todos.values()))
+    if files:
+        shown = '\n'.join(f"  • `{path}`" for path in files[:10])
+        more = f"\n  … 외 {len(files) - 10}개" if len(files) > 10 else ''
+        parts.append(f"\n✏️ *수정한 파일 ({len(files)}개):*\n{shown}{more}")
+    if last_turn.get('git_changes'):
+        parts.append(f"\n📝 *Git 변경:* {last_turn['git_changes']}")
+    parts.append(f"\n:open_file_folder: 프로젝트: `{turns[-1][0]}`")
+
+    message = '\n'.join(parts)
+    if len(message) > MAX_DIGEST_CHARS:
+        message = message[:MAX_DIGEST_CHARS - 1] + '…'
+    return f"📦 작업 요약 ({len(turns)}개 턴)", message
+
+
+def send_digest(token, channel, session, turns):
+    """Post one digest message through the outbox"""
+    if not token or not turns:
+        return None
+    title, message = render_digest(turns)
+    return post_message(token, build_message_payload(channel, title, message), session=session)
+
+
+def flush_digests(config, session=None):
+    """
+    Send digests that are due (or every turn of `session`, e.g. at SessionEnd)
+    Each session is sent with the settings it was recorded with; config is
+    only used for turns recorded without them.
+    Returns: number of digest messages queued
+    """
+    if not DEFAULT_DB.exists():
+        return 0
+
+    window = config['SLACK_DIGEST_WINDOW']
+    max_turns = config['SLACK_DIGEST_MAX_TURNS']
+
+    store = DigestStore()
+    try:
+        sessions = store.due_sessions(window, max_turns)
+        if session and session not in sessions:
+            sessions.append(session)
+
+        sent = 0
+        for due in sessions:
+            turns, settings = store.take_turns(due)
+            if turns:
+                token, channel = settings or (config['SLACK_BOT_TOKEN'], config['SLACK_CHANNEL_ID'])
+                send_digest(token, channel, due, turns)
+                sent += 1
+        return sent
+    finally:
+        store.close()
+
+
+def start_deferred_flush(delay):
+    """Send due digests after delay seconds from a detached process"""
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    try:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'flush', '--wait', str(delay + FLUSH_MARGIN)],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs
+        )
+    except OSError as e:
+        log.warning(f"Failed to schedule digest flush: {str(e)}")
+
+
+def record_turn(config, session, work_dir, turn):
+    """Record one Stop turn and send digests that became due"""
+    store = DigestStore()
+    try:
+        first = store.add_turn(session, work_dir, turn, config)
+        # 메시지가 Slack 제한에 가까워지면 창이 끝나기 전에 전송
+        title, message = render_digest(store.get_turns(session))
+        oversized = len(message) >= MAX_DIGEST_CHARS
+    finally:
+        store.close()
+
+    sent = flush_digests(config, session if oversized else None)
+    if first and not oversized and config['SLACK_DIGEST_MAX_TURNS'] > 1:
+        # 창마다 하나: 다른 Hook이 실행되지 않아도 창이 끝나면 전송
+        start_deferred_flush(config['SLACK_DIGEST_WINDOW'])
+    return sent
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] != 'flush':
+        print(__doc__)
+        sys.exit(1)
+
+    from hook_config import load_config
+    if len(args) == 3 and args[1] == '--wait':
+        time.sleep(float(args[2]))
+    # 세션별 설정으로 전송 (설정 없이 기록된 이전 턴만 홈 설정 사용)
+    print(f"{flush_digests(load_config())} digest(s) sent")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+File Lock Module
+Cross-process exclusive lock on a file, shared by the hooks and helpers
+
+Used for the Slack rate-limit bucket, log rotation, trace files, the
+GitLab push queue and the repository commit lock. The lock is advisory (fcntl.flock on POSIX, msvcrt on
+Windows) and is dropped by the OS when the holding process exits.
+"""
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+class FileLock:
+    """
+    Exclusive lock on a file (fcntl on POSIX, msvcrt on Windows)
+    With blocking=False, entering raises OSError if another process holds it.
+    """
+
+    def __init__(self, path, blocking=True):
+        self.path = Path(path)
+        self.blocking = blocking
+        self.file = None
+
+    def acquire(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file, fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK if self.blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            self.file.close()
+            self.file = None
+            raise
+
+    def release(self):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file, fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Git Snapshot Module
+One `git status --porcelain=v2 -z --branch` call parsed into a structured object
+
+The Stop/SessionEnd Slack formatters and the GitLab pusher share the same
+snapshot instead of each running `rev-parse`, `status --short` and
+`diff --name-only` and slicing columns. NUL-separated porcelain v2 keeps
+paths with spaces intact and reports renames with their original path.
+
+Session baselines: SessionStart records HEAD plus a tree object of the
+index and working tree (including untracked files), written through a
+throwaway copy of the index (a private temp file inside the git
+directory) so the real index and stash are untouched. Stop and
+SessionEnd then report only what changed since that tree, with per-file
+insertions/deletions from one `git diff --numstat` of the working tree
+against it. For that diff, untracked files are only marked
+intent-to-add, so no blobs are written for them on every turn.
+The tree is an unreachable object, kept by git for gc.pruneExpire
+(two weeks by default), which outlives any session.
+
+Large repositories: every git call gets a hard time budget
+(GIT_STATUS_TIMEOUT). Repositories whose index has at least
+GIT_LARGE_REPO_FILES entries (or GIT_LARGE_REPO=true) also run git with
+the untracked cache, optionally fsmonitor and `--untracked-files=no`,
+and skip the ahead/behind count. When `git status` still runs out of
+time the snapshot degrades to a lower bound ("N+ files changed") counted
+from the streamed output of `git ls-files -m`, instead of blocking the
+hook.
+
+Usage:
+    git_snapshot.py [DIR]            # print the snapshot of a working tree as JSON
+    git_snapshot.py baseline [DIR]   # record a baseline and print it
+    git_snapshot.py delta PPID       # print the delta of a session baseline
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from hook_config import load_config
+from hook_log import get_logger
+
+# 푸시처럼 Hook 응답과 무관한 작업이 전체 스캔에 쓸 수 있는 시간 (초)
+SCAN_TIMEOUT = 30
+# git status 시간 초과 후 변경 파일 수를 세는 데 쓰는 시간 (초)
+COUNT_TIMEOUT = 1
+
+log = get_logger('GIT_SNAPSHOT')
+
+
+class GitSnapshot:
+    """Branch and working tree state of a repository"""
+
+    __slots__ = ('oid', 'branch', 'upstream', 'ahead', 'behind', 'staged', 'unstaged',
+                 'untracked', 'added', 'renamed', 'deleted', 'conflicted', 'partial')
+
+    def __init__(self, oid=None, branch=None, upstream=None, ahead=0, behind=0, staged=None, unstaged=None,
+                 untracked=None, added=None, renamed=None, deleted=None, conflicted=None, partial=None):
+        self.oid = oid                      # HEAD 커밋 (초기 커밋 전이면 None)
+        self.branch = branch                # 현재 브랜치 (detached HEAD면 None)
+        self.upstream = upstream            # 추적 브랜치 (예: origin/main)
+        self.ahead = ahead                  # upstream보다 앞선 커밋 수
+        self.behind = behind                # upstream보다 뒤처진 커밋 수
+        self.staged = staged or []          # 인덱스 변경 경로
+        self.unstaged = unstaged or []      # 워킹트리 변경 경로 (추적 중인 파일)
+        self.untracked = untracked or []    # 추적하지 않는 새 파일
+        self.added = added or []            # 인덱스에 새로 추가된 파일
+        self.renamed = renamed or []        # [원래 경로, 새 경로]
+        self.deleted = deleted or []        # 인덱스 또는 워킹트리에서 삭제된 경로
+        self.conflicted = conflicted or []  # 병합 충돌 경로
+        self.partial = partial              # 시간 초과 시 센 변경 파일 수의 하한 (정상 스냅샷이면 None)
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in cls.__slots__ if name in data})
+
+    @property
+    def has_changes(self):
+        if self.partial is not None:
+            # 시간 초과: 변경 여부를 알 수 없으므로 있다고 가정
+            return True
+        return bool(self.staged or self.unstaged or self.untracked or self.conflicted)
+
+    @property
+    def modified(self):
+        """Tracked files changed in the working tree but not deleted"""
+        deleted = set(self.deleted)
+        return [path for path in self.unstaged if path not in deleted]
+
+    def changed_files(self):
+        """Every changed path once, in status order"""
+        return list(dict.fromkeys(self.staged + self.unstaged + self.untracked + self.conflicted))
+
+    def format_changes(self):
+        """Short Korean summary for Slack, e.g. '수정 2개 생성 1개 스테이징 1개'"""
+        if self.partial is not None:
+            return f"파일 {self.partial}+개 변경 (git status 시간 초과)" if self.partial else "git status 시간 초과"
+        changes = []
+        for label, paths in (('수정', self.modified), ('생성', self.untracked), ('삭제', self.deleted),
+                             ('이름 변경', self.renamed), ('스테이징', self.staged), ('충돌', self.conflicted)):
+            if paths:
+                changes.append(f"{label} {len(paths)}개")
+        return ' '.join(changes)
+
+    def __repr__(self):
+        if self.partial is not None:
+            return f"GitSnapshot(branch={self.branch!r}, partial={self.partial})"
+        return (f"GitSnapshot(branch={self.branch!r}, ahead={self.ahead}, behind={self.behind}, "
+                f"staged={len(self.staged)}, unstaged={len(self.unstaged)}, untracked={len(self.untracked)})")
+
+
+def parse_status(data):
+    """Parse `git status --porcelain=v2 -z --branch` output"""
+    snapshot = GitSnapshot()
+    entries = data.split('\0')
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if not entry:
+            continue
+
+        kind = entry[0]
+        if kind == '#':
+            header = entry[2:].split(' ')
+            if header[0] == 'branch.oid' and header[1] != '(initial)':
+                snapshot.oid = header[1]
+            elif header[0] == 'branch.head' and header[1] != '(detached)':
+                snapshot.branch = header[1]
+            elif header[0] == 'branch.upstream':
+                snapshot.upstream = header[1]
+            elif header[0] == 'branch.ab' and header[1] != '+?':
+                # --no-ahead-behind면 '+? -?' (계산하지 않음)
+                snapshot.ahead = int(header[1].lstrip('+'))
+                snapshot.behind = int(header[2].lstrip('-'))
+        elif kind == '?':
+            snapshot.untracked.append(entry[2:])
+        elif kind == 'u':
+            # u XY sub m1 m2 m3 mW h1 h2 h3 path
+            snapshot.conflicted.append(entry.split(' ', 10)[10])
+        elif kind in '12':
+            if kind == '1':
+                # 1 XY sub mH mI mW hH hI path
+                fields = entry.split(' ', 8)
+            else:
+                # 2 XY sub mH mI mW hH hI Xscore path, 다음 항목이 원래 경로
+                fields = entry.split(' ', 9)
+                snapshot.renamed.append([entries[index], fields[-1]])
+                index += 1
+            xy, path = fields[1], fields[-1]
+            if xy[0] != '.':
+                snapshot.staged.append(path)
+            if xy[1] != '.':
+                snapshot.unstaged.append(path)
+            if xy[0] == 'A':
+                snapshot.added.append(path)
+            if 'D' in xy:
+                snapshot.deleted.append(path)
+    return snapshot
+
+
+def find_index_file(work_dir):
+    """Index file of the repository containing work_dir, found without running git"""
+    try:
+        current = Path(work_dir or os.getcwd()).resolve()
+    except OSError:
+        return None
+    for directory in [current] + list(current.parents):
+        git_path = directory / '.git'
+        if git_path.is_dir():
+            return git_path / 'index'
+        if git_path.is_file():
+            # 워크트리/서브모듈: 'gitdir: <경로>'
+            try:
+                with open(git_path, 'r', encoding='utf-8') as f:
+                    line = f.readline().strip()
+            except OSError:
+                return None
+            if line.startswith('gitdir:'):
+                return directory / line[len('gitdir:'):].strip() / 'index'
+            return None
+    return None
+
+
+def count_index_entries(index_file):
+    """Number of entries in a git index, read from its 12-byte header (None if unreadable)"""
+    if index_file is None:
+        return None
+    try:
+        with open(index_file, 'rb') as f:
+            header = f.read(12)
+    except OSError:
+        return None
+    if len(header) < 12 or header[:4] != b'DIRC':
+        return None
+    return int.from_bytes(header[8:12], 'big')
+
+
+def git_settings(work_dir=None, config=None):
+    """
+    How to run git in work_dir, from the GIT_* settings
+    Returns: dict with timeout (s), large (bool), untracked (bool) and git_args (-c options)
+    """
+    if config is None:
+        config = load_config(work_dir)
+
+    mode = config['GIT_LARGE_REPO']
+    if mode == 'auto':
+        entries = count_index_entries(find_index_file(work_dir))
+        large = entries is not None and entries >= config['GIT_LARGE_REPO_FILES']
+    else:
+        large = mode == 'true'
+
+    git_args = []
+    if large:
+        git_args += ['-c', 'core.untrackedCache=true']
+        if config['GIT_LARGE_REPO_FSMONITOR']:
+            git_args += ['-c', 'core.fsmonitor=true']
+    return {
+        'timeout': max(1, config['GIT_STATUS_TIMEOUT']),
+        'large': large,
+        'untracked': not large or config['GIT_LARGE_REPO_UNTRACKED'],
+        'git_args': git_args,
+    }
+
+
+def count_changed_files(work_dir, settings, timeout=COUNT_TIMEOUT):
+    """
+    Lower bound of changed tracked files, for when `git status` ran out of time
+    Counts `git ls-files -m` paths as they stream in and stops at the deadline.
+    """
+    try:
+        process = subprocess.Popen(
+            ['git'] + settings['git_args'] + ['ls-files', '-m', '-z', ':/'],
+            cwd=work_dir,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        return 0
+
+    counted = [0]
+
+    def read():
+        while True:
+            chunk = process.stdout.read1(65536)
+            if not chunk:
+                break
+            counted[0] += chunk.count(b'\0')
+
+    # Windows 파이프는 select를 쓸 수 없으므로 스레드에서 읽음
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    reader.join(timeout)
+    if reader.is_alive():
+        process.kill()
+        reader.join(1)
+    process.wait()
+    process.stdout.close()
+    return counted[0]
+
+
+def take_snapshot(work_dir=None, settings=None):
+    """
+    Snapshot the working tree with a single git call
+    settings: git_settings() for work_dir (None = from the configuration)
+    Returns: GitSnapshot (partial if git ran out of time),
+             or None if work_dir is not a git repository or git fails
+    """
+    if settings is None:
+        settings = git_settings(work_dir)
+
+    args = ['git'] + settings['git_args'] + ['status', '--porcelain=v2', '-z', '--branch']
+    if settings['large']:
+        # ahead/behind 계산은 오래 갈라진 브랜치에서 느림
+        args.append('--no-ahead-behind')
+    if not settings['untracked']:
+        args.append('--untracked-files=no')
+
+    try:
+        result = subprocess.run(args, cwd=work_dir, capture_output=True, timeout=settings['timeout'])
+    except subprocess.TimeoutExpired:
+        return GitSnapshot(partial=count_changed_files(work_dir, settings))
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+    return parse_status(result.stdout.decode('utf-8', errors='replace'))
+
+
+def get_baseline_file(ppid):
+    return Path(tempfile.gettempdir()) / f'.claude-session-baseline-{ppid}.json'
+
+
+def run_with_worktree_index(repo, add_args, args, settings):
+    """
+    Run `git add <add_args>` (skipped if None) and then `git <args>` against a temporary copy of the index
+    The copy is a private mkstemp file inside the git directory; both
+    commands share the settings' time budget.
+    Returns: stdout bytes of the second command, or None on failure or timeout
+    """
+    git = ['git'] + settings['git_args']
+    try:
+        # 예측 가능한 /tmp 경로 대신 git 디렉터리 안의 0600 임시 파일
+        fd, tmp_index = tempfile.mkstemp(prefix='claude-baseline-index-', dir=os.path.dirname(repo['index']))
+        os.close(fd)
+    except OSError as e:
+        log.warning(f"Cannot create temporary index, session baseline not used: {str(e)}")
+        return None
+    try:
+        # 인덱스를 복사해 stat 캐시를 재사용 (빈 인덱스면 모든 파일을 다시 해시함)
+        if os.path.exists(repo['index']):
+            shutil.copyfile(repo['index'], tmp_index)
+        else:
+            # 첫 커밋 전: 빈 파일은 손상된 인덱스로 취급되므로 git이 새로 만들게 함
+            os.remove(tmp_index)
+        env = dict(os.environ, GIT_INDEX_FILE=tmp_index)
+        deadline = time.monotonic() + settings['timeout']
+
+        if add_args is not None:
+            command = 'add'
+            result = subprocess.run(git + ['add'] + add_args, cwd=repo['toplevel'], env=env,
+                                    capture_output=True, timeout=settings['timeout'])
+            if result.returncode != 0:
+                log.debug(f"git add failed: {result.stderr.decode('utf-8', errors='replace').strip()}")
+                return None
+        command = args[0]
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise subprocess.TimeoutExpired(git + args, 0)
+        result = subprocess.run(git + args, cwd=repo['toplevel'], env=env,
+                                capture_output=True, timeout=remaining)
+        if result.returncode != 0:
+            log.debug(f"git {command} failed: {result.stderr.decode('utf-8', errors='replace').strip()}")
+            return None
+        return result.stdout
+    except subprocess.TimeoutExpired:
+        log.warning(f"git {command} ran out of time ({settings['timeout']}s) in {repo['toplevel']}, "
+                    f"session baseline not used")
+        return None
+    except OSError as e:
+        log.warning(f"Session baseline git call failed: {str(e)}")
+        return None
+    finally:
+        try:
+            os.remove(tmp_index)
+        except OSError:
+            pass
+
+
+def create_baseline(work_dir, settings=None):
+    """
+    Record HEAD and a tree of the current index + working tree
+    Returns: baseline dict, or None if work_dir is not a git repository or git ran out of time
+    """
+    if settings is None:
+        settings = git_settings(work_dir)
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--show-toplevel', '--git-path', 'index', 'HEAD'],
+            cwd=work_dir,
+            capture_output=True,
+            timeout=5
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    lines = result.stdout.decode('utf-8', errors='replace').splitlines()
+    if len(lines) < 2:
+        return None
+
+    repo = {
+        'work_dir': str(work_dir),
+        'toplevel': lines[0],
+        'index': os.path.join(work_dir, lines[1]),
+        # 첫 커밋 전이면 HEAD 없음
+        'head': lines[2] if result.returncode == 0 and len(lines) > 2 else None,
+        'created': int(time.time()),
+        'untracked': settings['untracked'],
+    }
+    # 기준선에는 추적하지 않는 파일의 내용도 필요 (세션당 한 번)
+    add_args = ['-A'] if settings['untracked'] else ['-u']
+    tree = run_with_worktree_index(repo, add_args, ['write-tree'], settings)
+    if not tree:
+        return None
+    repo['tree'] = tree.decode('ascii').strip()
+    return repo
+
+
+def save_baseline(ppid, work_dir):
+    """Record the session baseline (SessionStart); returns the baseline or None"""
+    baseline = create_baseline(work_dir)
+    if baseline is not None:
+        with open(get_baseline_file(ppid), 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False)
+    return baseline
+
+
+def load_baseline(ppid, work_dir):
+    """Session baseline recorded for work_dir (None if missing or for another directory)"""
+    try:
+        with open(get_baseline_file(ppid), 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if baseline.get('work_dir') != str(work_dir) or not baseline.get('tree'):
+        return None
+    return baseline
+
+
+def remove_baseline(ppid):
+    try:
+        get_baseline_file(ppid).unlink()
+    except OSError:
+        pass
+
+
+def parse_numstat(data):
+    """Parse `git diff --numstat -z` output into [{path, added, deleted, old_path}]"""
+    files = []
+    entries = data.split('\0')
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if not entry:
+            continue
+        added, deleted, path = entry.split('\t', 2)
+        old_path = None
+        if not path:
+            # 이름 변경: 다음 두 항목이 원래 경로와 새 경로
+            old_path, path = entries[index], entries[index + 1]
+            index += 2
+        files.append({
+            'path': path,
+            # 바이너리 파일은 줄 수 대신 '-'
+            'added': int(added) if added != '-' else None,
+            'deleted': int(deleted) if deleted != '-' else None,
+            'old_path': old_path,
+        })
+    return files
+
+
+def diff_baseline(baseline, settings=None):
+    """
+    Files changed since the baseline tree (committed or not, including new files)
+    Returns: list of numstat dicts, or None if git fails or runs out of time
+    """
+    if settings is None:
+        settings = git_settings(baseline['work_dir'])
+    # 새 파일은 intent-to-add로만 표시: 내용은 작업 트리에서 바로 비교 (blob을 쓰지 않음)
+    add_args = ['-N', '--', '.'] if baseline.get('untracked', True) else None
+    output = run_with_worktree_index(baseline, add_args, ['diff', '--numstat', '-z', '-M', baseline['tree']],
+                                     settings)
+    if output is None:
+        return None
+    return parse_numstat(output.decode('utf-8', errors='replace'))
+
+
+def format_delta(files):
+    """Short Korean summary of a baseline delta, e.g. '파일 3개 (+120 −15)'"""
+    if not files:
+        return ''
+    added = sum(f['added'] or 0 for f in files)
+    deleted = sum(f['deleted'] or 0 for f in files)
+    return f"파일 {len(files)}개 (+{added} −{deleted})"
+
+
+def format_delta_file(entry):
+    """One file line of a baseline delta for Slack"""
+    if entry['added'] is None:
+        stats = '바이너리'
+    else:
+        stats = f"+{entry['added']} −{entry['deleted']}"
+    name = f"{entry['old_path']} → {entry['path']}" if entry.get('old_path') else entry['path']
+    return f"`{name}` ({stats})"
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == 'baseline':
+        baseline = create_baseline(args[1] if len(args) > 1 else os.getcwd())
+        output = baseline
+    elif args and args[0] == 'delta':
+        baseline = load_baseline(args[1], os.getcwd()) if len(args) > 1 else None
+        if baseline is None:
+            print("No baseline for this session and directory", file=sys.stderr)
+            sys.exit(1)
+        output = diff_baseline(baseline)
+    else:
+        snapshot = take_snapshot(args[0] if args else os.getcwd())
+        output = snapshot.to_dict() if snapshot is not None else None
+
+    if output is None:
+        print("Not a git repository", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
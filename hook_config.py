@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Hook Config Module
+Single loader for ~/.ultrathink.env shared by the hooks and helper scripts
+
+Settings are layered (later wins):
+    1. defaults from CONFIG_SCHEMA
+    2. ~/.ultrathink.env
+    3. the nearest .ultrathink.env in the project directory or its parents,
+       up to the git repository root (only the directory itself outside a
+       repository); it may only set PROJECT_KEYS, so a cloned repository
+       cannot change tokens, the GitLab remote or whether auto-push runs
+    4. environment variables with the same names (inside the hook daemon:
+       those of the hook process that forwarded the event)
+
+Values are validated and converted once (bool/int/choice) when a file is
+parsed. The parsed result is memoized per process and cached on disk keyed
+by each file's (mtime, size), so a Stop, its pusher subprocess and the
+update check don't each re-parse the same file. The cache holds the
+tokens, so it is written 0600 into a per-user runtime directory that is
+used only if it is a 0700 directory owned by the current user. Invalid
+values fall back to the default and are logged.
+
+Usage:
+    hook_config.py [PROJECT_DIR]   # print the effective configuration
+"""
+import errno
+import hashlib
+import json
+import os
+import stat
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+from hook_log import get_logger
+
+ENV_FILE_NAME = '.ultrathink.env'
+ENV_FILE = Path.home() / ENV_FILE_NAME
+
+# key: (type, default) - type은 'str', 'bool', 'int' 또는 허용 값 튜플
+CONFIG_SCHEMA = {
+    'SLACK_BOT_TOKEN': ('str', ''),
+    'SLACK_CHANNEL_ID': ('str', 'C09J29WDSHK'),
+    'SLACK_USER_NAME': ('str', ''),
+    'SLACK_MESSAGE_MODE': (('post', 'update', 'digest'), 'post'),
+    'SLACK_UPDATE_COALESCE': ('int', 5),
+    'SLACK_DIGEST_WINDOW': ('int', 600),
+    'SLACK_DIGEST_MAX_TURNS': ('int', 10),
+    'STOP_ASYNC': ('bool', False),
+    'HOOK_DAEMON_ENABLED': ('bool', False),
+    'HOOK_DAEMON_IDLE_TIMEOUT': ('int', 1800),
+    'HOOK_LOG_LEVEL': (('debug', 'info', 'warning', 'error'), 'info'),
+    'AUTO_UPDATE_ENABLED': ('bool', True),
+    'UPDATE_CHECK_INTERVAL': ('int', 86400),
+    'GIT_STATUS_TIMEOUT': ('int', 3),
+    'GIT_LARGE_REPO': (('auto', 'true', 'false'), 'auto'),
+    'GIT_LARGE_REPO_FILES': ('int', 50000),
+    'GIT_LARGE_REPO_UNTRACKED': ('bool', True),
+    'GIT_LARGE_REPO_FSMONITOR': ('bool', False),
+    'GITLAB_AUTO_PUSH_ENABLED': ('bool', False),
+    'GITLAB_REPO_URL': ('str', ''),
+    'GITLAB_ACCESS_TOKEN': ('str', ''),
+    'GITLAB_REMOTE_NAME': ('str', 'gitlab'),
+    'GITLAB_AUTO_COMMIT_MESSAGE': ('str', ''),
+    'GITLAB_STAGING_MODE': (('session', 'all'), 'session'),
+    'GITLAB_PUSH_INTERVAL': ('int', 300),
+}
+
+# 프로젝트 .ultrathink.env가 바꿀 수 있는 설정
+# (토큰, GitLab 원격 저장소, 자동 푸시 여부, 데몬/업데이트, 로그 수준은 홈 파일과 환경 변수에서만)
+PROJECT_KEYS = frozenset([
+    'SLACK_CHANNEL_ID', 'SLACK_USER_NAME', 'SLACK_MESSAGE_MODE', 'SLACK_UPDATE_COALESCE',
+    'SLACK_DIGEST_WINDOW', 'SLACK_DIGEST_MAX_TURNS', 'STOP_ASYNC',
+    'GIT_STATUS_TIMEOUT', 'GIT_LARGE_REPO', 'GIT_LARGE_REPO_FILES', 'GIT_LARGE_REPO_UNTRACKED',
+    'GIT_LARGE_REPO_FSMONITOR', 'GITLAB_AUTO_COMMIT_MESSAGE', 'GITLAB_STAGING_MODE', 'GITLAB_PUSH_INTERVAL',
+])
+
+# 디스크 캐시에 보관할 레이어 조합 수
+MAX_CACHE_ENTRIES = 16
+# 스키마가 바뀌면 (업데이트로 키/기본값 추가) 디스크 캐시를 다시 계산
+SCHEMA_STAMP = hashlib.sha1(
+    repr((sorted(CONFIG_SCHEMA.items()), sorted(PROJECT_KEYS))).encode('utf-8')
+).hexdigest()[:12]
+
+# 프로세스 내 메모 (stamps key -> values)
+_memo = {}
+# 데몬이 처리 중인 이벤트를 보낸 Hook의 환경 변수 (스레드별)
+_request = threading.local()
+
+log = get_logger('CONFIG')
+
+
+def parse_env_file(env_path):
+    """Parse KEY=VALUE lines of an .env file into raw strings"""
+    env_vars = {}
+    if not os.path.exists(env_path):
+        return env_vars
+
+    with open(env_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith('#') and '=' in line:
+                key, value = line.split('=', 1)
+                env_vars[key.strip()] = value.strip().strip('"').strip("'")
+    return env_vars
+
+
+def convert_value(key, raw):
+    """
+    Validate and convert one raw setting
+    Raises: ValueError if the value does not match the schema type
+    """
+    kind, default = CONFIG_SCHEMA.get(key, ('str', ''))
+    raw = raw.strip()
+
+    if kind == 'bool':
+        lowered = raw.lower()
+        if lowered in ('true', '1', 'yes', 'on'):
+            return True
+        if lowered in ('false', '0', 'no', 'off', ''):
+            return False
+        raise ValueError(f"{key}={raw!r} is not a boolean")
+    if kind == 'int':
+        value = int(raw)
+        if value < 0:
+            raise ValueError(f"{key}={raw!r} must not be negative")
+        return value
+    if isinstance(kind, tuple):
+        lowered = raw.lower()
+        if lowered not in kind:
+            raise ValueError(f"{key}={raw!r} must be one of {', '.join(kind)}")
+        return lowered
+    if key == 'SLACK_CHANNEL_ID':
+        return raw.lstrip('#')
+    return raw
+
+
+def apply_layer(values, raw_values, source):
+    """Merge raw settings into values, keeping the previous value on errors"""
+    for key, raw in raw_values.items():
+        try:
+            values[key] = convert_value(key, raw)
+        except ValueError as e:
+            log.warning(f"Invalid setting in {source}: {str(e)} (using {values.get(key)!r})")
+
+
+def restrict_project_layer(raw_values, source):
+    """Keep only the PROJECT_KEYS of a project .ultrathink.env"""
+    allowed = {key: value for key, value in raw_values.items() if key in PROJECT_KEYS}
+    ignored = sorted(set(raw_values) - set(allowed))
+    if ignored:
+        log.warning(f"Ignoring {', '.join(ignored)} in {source} (only allowed in ~/{ENV_FILE_NAME} "
+                    f"or the environment)")
+    return allowed
+
+
+def find_project_env(work_dir):
+    """
+    Nearest .ultrathink.env in work_dir or its parents up to the git repository root
+    Outside a repository only work_dir itself is checked, so shared parents
+    such as /tmp are never used; the home directory is never a project.
+    """
+    if not work_dir:
+        return None
+    try:
+        current = Path(work_dir).resolve()
+        home = Path.home().resolve()
+    except OSError:
+        return None
+
+    directories = []
+    in_repository = False
+    for directory in [current] + list(current.parents):
+        if directory == home:
+            break
+        directories.append(directory)
+        if (directory / '.git').exists():
+            in_repository = True
+            break
+    if not in_repository:
+        directories = directories[:1]
+
+    for directory in directories:
+        candidate = directory / ENV_FILE_NAME
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def environment_overrides():
+    """Config keys set in the environment (inside the daemon: the forwarding hook's environment)"""
+    environ = getattr(_request, 'environ', None)
+    if environ is None:
+        environ = os.environ
+    return {key: environ[key] for key in CONFIG_SCHEMA if key in environ}
+
+
+@contextmanager
+def request_environment(environ):
+    """Resolve the environment layer from a hook's variables in this thread (used by hook_daemon)"""
+    _request.environ = environ
+    try:
+        yield
+    finally:
+        _request.environ = None
+
+
+def subprocess_environment():
+    """os.environ with the config keys of environment_overrides(), for subprocesses that load the config"""
+    environ = {key: value for key, value in os.environ.items() if key not in CONFIG_SCHEMA}
+    environ.update(environment_overrides())
+    return environ
+
+
+def get_runtime_dir():
+    """
+    Per-user directory in the temp dir for the config cache and the daemon socket
+    Raises: OSError if it exists but is not a 0700 directory owned by this user
+            (another local user could have created it first)
+    """
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    runtime_dir = Path(tempfile.gettempdir()) / f'claude-hooks-{uid}'
+    try:
+        runtime_dir.mkdir(mode=0o700)
+        # umask가 권한을 바꿨을 수 있음
+        os.chmod(runtime_dir, 0o700)
+    except FileExistsError:
+        pass
+
+    if hasattr(os, 'getuid'):
+        # 심볼릭 링크도 거부 (lstat)
+        st = os.lstat(runtime_dir)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != uid or stat.S_IMODE(st.st_mode) != 0o700:
+            log.warning(f"Refusing {runtime_dir}: not a 0700 directory owned by uid {uid}")
+            raise OSError(errno.EPERM, f"unsafe runtime directory: {runtime_dir}")
+    return runtime_dir
+
+
+def get_cache_file():
+    """Per-user cache file (it holds tokens: 0600 in a verified 0700 directory)"""
+    return get_runtime_dir() / 'config-cache.json'
+
+
+def load_disk_cache():
+    try:
+        cache_file = get_cache_file()
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            if os.name == 'posix' and os.fstat(f.fileno()).st_mode & 0o077:
+                # 이전 버전이 0644로 저장한 캐시 (토큰 포함): 버리고 0600으로 다시 저장
+                os.unlink(cache_file)
+                return {}
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_disk_cache(cache):
+    try:
+        cache_file = get_cache_file()
+        tmp_file = cache_file.with_name(f"{cache_file.name}.{os.getpid()}.tmp")
+        # 남은 임시 파일의 권한을 물려받지 않도록 새로 생성
+        try:
+            os.unlink(tmp_file)
+        except FileNotFoundError:
+            pass
+        fd = os.open(str(tmp_file), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(cache, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+
+def load_file_layers(layers):
+    """
+    Defaults + file layers, parsed once per (mtime, size) of every file
+    layers: list of (path, is_project) - project files may only set PROJECT_KEYS
+    """
+    stamps = []
+    for path, is_project in layers:
+        try:
+            st = os.stat(path)
+            stamps.append([str(path), is_project, st.st_mtime_ns, st.st_size])
+        except OSError:
+            stamps.append([str(path), is_project, None, None])
+    key = json.dumps([SCHEMA_STAMP] + stamps)
+
+    values = _memo.get(key)
+    if values is not None:
+        return values
+
+    cache = load_disk_cache()
+    values = cache.get(key)
+    if values is None:
+        values = {name: default for name, (kind, default) in CONFIG_SCHEMA.items()}
+        for path, is_project, mtime, size in stamps:
+            if mtime is None:
+                continue
+            raw_values = parse_env_file(path)
+            if is_project:
+                raw_values = restrict_project_layer(raw_values, path)
+            apply_layer(values, raw_values, path)
+
+        # 오래된 조합은 버림 (dict는 삽입 순서 유지)
+        cache.pop(key, None)
+        cache[key] = values
+        while len(cache) > MAX_CACHE_ENTRIES:
+            cache.pop(next(iter(cache)))
+        save_disk_cache(cache)
+
+    _memo[key] = values
+    return values
+
+
+def load_config(work_dir=None):
+    """
+    Return the effective configuration for a project directory
+    Schema keys have validated types; unknown keys stay strings.
+    """
+    layers = [(ENV_FILE, False)]
+    project_env = find_project_env(work_dir)
+    if project_env is not None and project_env != ENV_FILE:
+        layers.append((project_env, True))
+
+    values = dict(load_file_layers(layers))
+
+    # 환경 변수가 가장 우선
+    overrides = environment_overrides()
+    if overrides:
+        apply_layer(values, overrides, 'environment')
+    return values
+
+
+def main():
+    work_dir = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    config = load_config(work_dir)
+    for key in sorted(config):
+        value = config[key]
+        if key.endswith('_TOKEN') and value:
+            value = value[:8] + '…'
+        print(f"{key}={value}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Hook Daemon
+Optional long-lived process that runs hook events handed over by thin clients
+
+Hook executables call forward_to_daemon() with their stdin JSON. If the
+daemon is listening on its Unix socket, it acknowledges the event and the
+hook exits at once; the daemon then runs the hook's handle() with the
+config (parsed once per file change by hook_config) and warm modules. If the daemon is not running the
+hook handles the event in-process, and starts the daemon in the background
+when HOOK_DAEMON_ENABLED=true is set in ~/.ultrathink.env. The socket is
+only used if its directory is a 0700 directory owned by the current user;
+otherwise every event is handled in-process.
+
+The daemon records the mtimes of the hook executables and every *.py in
+the hooks directory when it starts. Once any of them changes (an update,
+or SessionStart's auto-update pulling inside the daemon) it hands new
+events back to the hook to run in-process, waits for running handlers
+and re-executes itself, so hooks never run against stale helper modules.
+
+Usage:
+    hook_daemon.py serve     # run in foreground
+    hook_daemon.py status    # check whether the daemon is listening
+    hook_daemon.py stop      # ask a running daemon to exit
+"""
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+from hook_config import environment_overrides, get_runtime_dir, load_config, request_environment
+from hook_log import flush_logs, get_logger
+from hook_trace import trace_hook
+
+HOOKS_DIR = Path(__file__).parent
+HOOK_EVENTS = ('SessionStart', 'Stop', 'Notification', 'SessionEnd')
+
+# 클라이언트가 데몬 응답을 기다리는 최대 시간 (초)
+CONNECT_TIMEOUT = 0.5
+# 요청 최대 크기
+MAX_REQUEST_SIZE = 16 * 1024 * 1024
+# Slack outbox 재전송 주기 (초)
+OUTBOX_FLUSH_INTERVAL = 30
+# 유휴 상태에서 Hook 파일 변경을 확인하는 주기 (초)
+SOURCE_CHECK_INTERVAL = 5
+# 재시작 전에 실행 중인 핸들러를 기다리는 최대 시간 (초)
+RESTART_DRAIN_TIMEOUT = 120
+
+log = get_logger('DAEMON')
+
+
+def get_socket_path():
+    """
+    Socket in the per-user runtime directory (hook_config.get_runtime_dir)
+    Raises: OSError if the directory is not a 0700 directory owned by this user
+    """
+    return get_runtime_dir() / 'daemon.sock'
+
+
+def is_supported():
+    """Unix sockets are required (not available on older Windows Pythons)"""
+    return hasattr(socket, 'AF_UNIX')
+
+
+# ---------------------------------------------------------------------------
+# Client side (runs inside the hook executables)
+# ---------------------------------------------------------------------------
+
+def send_request(request, timeout=CONNECT_TIMEOUT):
+    """Send one JSON request and return the daemon's reply line (or None)"""
+    if not is_supported():
+        return None
+
+    try:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        try:
+            sock.connect(str(get_socket_path()))
+            sock.sendall(json.dumps(request, ensure_ascii=False).encode('utf-8') + b'\n')
+            sock.shutdown(socket.SHUT_WR)
+            return sock.makefile('rb').readline().decode('utf-8').strip()
+        finally:
+            sock.close()
+    except (OSError, ValueError):
+        return None
+
+
+def start_daemon():
+    """Start the daemon in the background, detached from the hook process"""
+    try:
+        kwargs = {}
+        if os.name == 'posix':
+            kwargs['start_new_session'] = True
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'serve'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs
+        )
+        log.info("Daemon start requested")
+    except Exception as e:
+        log.error(f"Failed to start daemon: {str(e)}")
+
+
+def forward_to_daemon(event, input_data):
+    """
+    Hand a hook event over to the daemon
+    Returns: True if the daemon accepted it (hook can exit),
+             False if the hook must handle it in-process
+    """
+    if not is_supported():
+        return False
+    try:
+        get_socket_path()
+    except OSError:
+        # 다른 사용자가 만들었을 수 있는 디렉토리의 소켓은 믿지 않음 - 직접 처리
+        return False
+
+    reply = send_request({
+        'event': event,
+        'input': input_data,
+        'cwd': os.getcwd(),
+        'ppid': os.getppid(),
+        # 설정의 환경 변수 레이어는 데몬이 아니라 이 Hook 프로세스 기준
+        'env': environment_overrides(),
+    })
+    if reply == 'ok':
+        return True
+
+    # 데몬이 없으면 설정된 경우에만 백그라운드로 시작 (이번 이벤트는 직접 처리)
+    # 'restart': Hook 파일이 바뀌어 데몬이 스스로 재시작하는 중
+    if reply is None:
+        if load_config(os.getcwd())['HOOK_DAEMON_ENABLED']:
+            start_daemon()
+    return False
+
+
+# ---------------------------------------------------------------------------
+# Server side
+# ---------------------------------------------------------------------------
+
+def source_stamp():
+    """mtimes of the hook executables and helper modules (added/removed files count as changes)"""
+    stamp = {}
+    for path in sorted(HOOKS_DIR.glob('*.py')) + [HOOKS_DIR / event for event in HOOK_EVENTS]:
+        try:
+            stamp[path.name] = os.stat(path).st_mtime_ns
+        except OSError:
+            stamp[path.name] = None
+    return stamp
+
+
+class HookDaemon:
+    """Unix socket server that runs hook handlers in worker threads"""
+
+    def __init__(self, socket_path, idle_timeout):
+        self.socket_path = socket_path
+        self.idle_timeout = idle_timeout
+        self.modules = {}
+        self.modules_lock = threading.Lock()
+        self.active = 0
+        self.active_lock = threading.Lock()
+        self.last_activity = time.monotonic()
+        self.last_flush = time.monotonic()
+        self.last_source_check = time.monotonic()
+        self.flush_thread = None
+        self.running = True
+        self.restart = False
+        self.stamp = source_stamp()
+
+    def sources_changed(self):
+        """Whether any hook file changed since start (then stop accepting events and restart)"""
+        if self.restart:
+            return True
+        if source_stamp() != self.stamp:
+            log.info("Hook files changed, restarting daemon")
+            self.restart = True
+            self.running = False
+        return self.restart
+
+    def get_hook_module(self, event):
+        """Import a hook executable (no .py extension) once; file changes restart the daemon"""
+        from importlib.machinery import SourceFileLoader
+        from importlib.util import module_from_spec, spec_from_loader
+
+        with self.modules_lock:
+            module = self.modules.get(event)
+            if module is not None:
+                return module
+
+            loader = SourceFileLoader(f'hook_{event}', str(HOOKS_DIR / event))
+            module = module_from_spec(spec_from_loader(loader.name, loader))
+            loader.exec_module(module)
+            self.modules[event] = module
+            return module
+
+    def handle_event(self, request):
+        event = request.get('event')
+        try:
+            module = self.get_hook_module(event)
+            work_dir = request.get('cwd') or str(Path.home())
+            with request_environment(request.get('env') or {}), trace_hook(f'{event}@daemon'):
+                module.handle(
+                    request.get('input') or {},
+                    work_dir,
+                    request.get('ppid') or 0,
+                    load_config(work_dir)
+                )
+        except SystemExit:
+            pass
+        except Exception as e:
+            log.error(f"{event} handler error: {str(e)}")
+        finally:
+            # 상주 프로세스이므로 이벤트마다 로그 기록
+            flush_logs()
+
+    def flush_outbox(self):
+        """Retry queued Slack messages and send due digests while no hook is sending"""
+        try:
+            # 요약은 세션마다 기록된 설정으로 전송 (프로젝트 설정으로 요약 모드인 세션 포함)
+            from digest_store import flush_digests
+            flush_digests(load_config())
+            from slack_outbox import flush_pending
+            flush_pending()
+        except Exception as e:
+            log.error(f"Outbox flush error: {str(e)}")
+        finally:
+            flush_logs()
+
+    def handle_connection(self, conn):
+        with self.active_lock:
+            self.active += 1
+        try:
+            with conn:
+                conn.settimeout(5)
+                data = conn.makefile('rb').readline(MAX_REQUEST_SIZE)
+                request = json.loads(data.decode('utf-8'))
+                event = request.get('event')
+
+                if event == 'ping':
+                    conn.sendall(b'pong\n')
+                    return
+                if event == 'shutdown':
+                    self.running = False
+                    conn.sendall(b'bye\n')
+                    return
+                if event not in HOOK_EVENTS:
+                    conn.sendall(b'error\n')
+                    return
+                if self.sources_changed():
+                    # 훅이 새 코드로 직접 처리 (데몬은 재시작)
+                    conn.sendall(b'restart\n')
+                    return
+
+                # 수락 즉시 응답 - 훅 프로세스는 여기서 종료
+                conn.sendall(b'ok\n')
+
+            log.debug(f"{event} accepted (cwd: {request.get('cwd')})")
+            self.handle_event(request)
+        except Exception as e:
+            log.warning(f"Connection error: {str(e)}")
+        finally:
+            with self.active_lock:
+                self.active -= 1
+                self.last_activity = time.monotonic()
+
+    def serve(self):
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            server.bind(str(self.socket_path))
+        finally:
+            os.umask(old_umask)
+        server.listen(16)
+        server.settimeout(1.0)
+        log.info(f"Daemon listening on {self.socket_path} (PID: {os.getpid()})")
+
+        try:
+            while self.running:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    with self.active_lock:
+                        idle = self.active == 0 and time.monotonic() - self.last_activity > self.idle_timeout
+                    if idle:
+                        log.info("Idle timeout, exiting")
+                        break
+                    if time.monotonic() - self.last_source_check > SOURCE_CHECK_INTERVAL:
+                        self.last_source_check = time.monotonic()
+                        if self.sources_changed():
+                            break
+                    if time.monotonic() - self.last_flush > OUTBOX_FLUSH_INTERVAL:
+                        self.last_flush = time.monotonic()
+                        self.flush_thread = threading.Thread(target=self.flush_outbox, daemon=True)
+                        self.flush_thread.start()
+                    continue
+                self.last_activity = time.monotonic()
+                threading.Thread(target=self.handle_connection, args=(conn,)).start()
+        finally:
+            server.close()
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+    def drain(self, timeout=RESTART_DRAIN_TIMEOUT):
+        """Wait for running handlers and the outbox flush before re-executing"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self.active_lock:
+                if self.active == 0:
+                    break
+            time.sleep(0.1)
+        if self.flush_thread is not None:
+            self.flush_thread.join(max(0, deadline - time.monotonic()))
+
+
+def acquire_daemon_lock():
+    """Hold an exclusive lock so only one daemon runs per user"""
+    import fcntl
+
+    lock_file = open(get_runtime_dir() / 'daemon.lock', 'w')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    lock_file.write(str(os.getpid()))
+    lock_file.flush()
+    return lock_file
+
+
+def serve():
+    if not is_supported():
+        print("Unix sockets are not supported on this platform", file=sys.stderr)
+        return 1
+
+    try:
+        lock_file = acquire_daemon_lock()
+    except OSError as e:
+        log.error(f"Daemon not started: {str(e)}")
+        return 1
+    if lock_file is None:
+        log.debug("Daemon already running")
+        return 0
+
+    socket_path = get_socket_path()
+    # 이전 데몬이 남긴 소켓 파일 정리 (잠금을 얻었으므로 사용 중이 아님)
+    if socket_path.exists():
+        socket_path.unlink()
+
+    idle_timeout = load_config()['HOOK_DAEMON_IDLE_TIMEOUT']
+    daemon = HookDaemon(socket_path, idle_timeout)
+    daemon.serve()
+    if daemon.restart:
+        daemon.drain()
+        lock_file.close()
+        flush_logs()
+        # 새 코드로 다시 시작 (잠금/소켓은 exec 전에 정리됨)
+        os.execv(sys.executable, [sys.executable, str(Path(__file__).resolve()), 'serve'])
+    lock_file.close()
+    return 0
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+
+    if command == 'serve':
+        sys.exit(serve())
+    elif command == 'status':
+        reply = send_request({'event': 'ping'})
+        print("running" if reply == 'pong' else "not running")
+        sys.exit(0 if reply == 'pong' else 1)
+    elif command == 'stop':
+        reply = send_request({'event': 'shutdown'})
+        print("stopped" if reply == 'bye' else "not running")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Hook Log Module
+Shared, buffered, size-capped debug log for the hooks
+
+Records are kept in memory and written as JSON lines in a single
+O_APPEND write when the process exits (or when the buffer gets large,
+gets old, or an error is logged), so a routine hook run costs one write
+and lines from parallel sessions never interleave. The file is rotated
+to claude-hook-debug.log.1 once it exceeds MAX_LOG_BYTES, so the log
+never grows past about twice that size.
+
+The threshold comes from HOOK_LOG_LEVEL (debug/info/warning/error,
+default info) in ~/.ultrathink.env or the environment. It is read once
+per process (the daemon logs for every project), so a project
+.ultrathink.env cannot set it.
+
+Usage:
+    hook_log.py tail [N] [--level LEVEL]   # pretty-print the last N records
+"""
+import atexit
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from file_lock import FileLock
+
+LOG_FILE = Path(tempfile.gettempdir()) / 'claude-hook-debug.log'
+LOG_LOCK_FILE = Path(tempfile.gettempdir()) / 'claude-hook-debug.log.lock'
+
+# 로그 파일 최대 크기 (초과 시 .1로 교체, 백업은 1개만 유지)
+MAX_LOG_BYTES = 1024 * 1024
+# 한 레코드의 메시지 최대 길이
+MAX_MESSAGE_CHARS = 2000
+# 버퍼가 이만큼 차거나 오래되면 프로세스 종료 전이라도 기록 (데몬, 워커)
+MAX_BUFFER_RECORDS = 200
+MAX_BUFFER_AGE = 5
+
+LEVELS = {'debug': 10, 'info': 20, 'warning': 30, 'error': 40}
+DEFAULT_LEVEL = 'info'
+
+_buffer = []
+_buffer_started = None
+_buffer_lock = threading.RLock()
+_threshold = None
+_loggers = {}
+
+
+def get_threshold():
+    """Minimum level to record (read once per process from the config)"""
+    global _threshold
+    if _threshold is None:
+        # 설정 로딩 중 기록되는 로그가 다시 설정을 읽지 않도록 먼저 기본값 지정
+        _threshold = LEVELS[DEFAULT_LEVEL]
+        try:
+            from hook_config import load_config
+            _threshold = LEVELS.get(load_config()['HOOK_LOG_LEVEL'], _threshold)
+        except Exception:
+            pass
+    return _threshold
+
+
+class Logger:
+    """Per-module logger; `source` tags every record (e.g. STOP, OUTBOX)"""
+
+    def __init__(self, source):
+        self.source = source
+
+    def log(self, level, message):
+        if LEVELS[level] < get_threshold():
+            return
+        message = str(message)
+        if len(message) > MAX_MESSAGE_CHARS:
+            message = message[:MAX_MESSAGE_CHARS] + f"… ({len(message)} chars)"
+        record = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'level': level,
+            'src': self.source,
+            'pid': os.getpid(),
+            'msg': message,
+        }
+        append_record(json.dumps(record, ensure_ascii=False) + '\n', flush_now=(level == 'error'))
+
+    def debug(self, message):
+        self.log('debug', message)
+
+    def info(self, message):
+        self.log('info', message)
+
+    def warning(self, message):
+        self.log('warning', message)
+
+    def error(self, message):
+        self.log('error', message)
+
+
+def get_logger(source):
+    """Return the shared logger for a source tag"""
+    logger = _loggers.get(source)
+    if logger is None:
+        logger = _loggers[source] = Logger(source)
+    return logger
+
+
+def append_record(line, flush_now=False):
+    global _buffer_started
+    with _buffer_lock:
+        if not _buffer:
+            _buffer_started = time.monotonic()
+        _buffer.append(line)
+        if (flush_now or len(_buffer) >= MAX_BUFFER_RECORDS
+                or time.monotonic() - _buffer_started >= MAX_BUFFER_AGE):
+            flush_logs()
+
+
+def flush_logs():
+    """Write buffered records with one append (rotating the file when it is full)"""
+    with _buffer_lock:
+        if not _buffer:
+            return
+        data = ''.join(_buffer).encode('utf-8')
+        del _buffer[:]
+
+        try:
+            fd = os.open(str(LOG_FILE), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+            try:
+                size = os.fstat(fd).st_size
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            if size + len(data) > MAX_LOG_BYTES:
+                rotate()
+        except OSError:
+            pass
+
+
+def rotate():
+    """Move the full log aside (once, even if several processes notice at the same time)"""
+    with FileLock(LOG_LOCK_FILE):
+        try:
+            if LOG_FILE.stat().st_size > MAX_LOG_BYTES:
+                os.replace(LOG_FILE, LOG_FILE.with_name(LOG_FILE.name + '.1'))
+        except OSError:
+            pass
+
+
+atexit.register(flush_logs)
+
+
+def print_tail(count, min_level):
+    lines = []
+    for path in (LOG_FILE.with_name(LOG_FILE.name + '.1'), LOG_FILE):
+        try:
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                lines.extend(f.readlines())
+        except OSError:
+            pass
+
+    records = []
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(record, dict) and LEVELS.get(record.get('level'), 0) >= LEVELS[min_level]:
+            records.append(record)
+
+    # 프로세스별 버퍼 단위로 기록되므로 시간순으로 정렬해서 출력
+    records.sort(key=lambda record: str(record.get('ts', '')))
+    for record in records[-count:]:
+        print(f"{record.get('ts', '')} {record.get('level', '').upper():<7} "
+              f"[{record.get('src', '')}:{record.get('pid', '')}] {record.get('msg', '')}")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] != 'tail':
+        print(__doc__)
+        sys.exit(1)
+
+    min_level = 'debug'
+    if '--level' in args:
+        min_level = args.pop(args.index('--level') + 1).lower()
+        args.remove('--level')
+        if min_level not in LEVELS:
+            print(f"Unknown level: {min_level}", file=sys.stderr)
+            sys.exit(1)
+    count = int(args[1]) if len(args) > 1 else 50
+    print_tail(count, min_level)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Hook Report Module
+Analysis, git state and Slack messages shared by Stop and SessionEnd
+
+Both hooks report the same things for a session: the transcript analysis,
+the changes since the session baseline (or the working-tree snapshot when
+there is none) and a header + section Slack message posted through the
+outbox or edited in place. Git results are cached per transcript state,
+so SessionEnd reuses what Stop computed for the last turn.
+"""
+import os
+
+from analysis_cache import get_analysis, get_cached_value, set_cached_value
+from analyze_transcript import AnalysisResult
+from git_snapshot import GitSnapshot, diff_baseline, take_snapshot
+from hook_log import get_logger
+from hook_trace import span
+from slack_outbox import post_message
+
+log = get_logger('REPORT')
+
+
+def run_analysis(transcript_path):
+    """Analyze transcript in-process (shared between Stop and SessionEnd via cache)"""
+    if not transcript_path or not os.path.exists(transcript_path):
+        return AnalysisResult()
+
+    try:
+        # 직전 훅이 분석한 결과가 있으면 재사용 (증분만 분석)
+        with span('analysis'):
+            analysis = get_analysis(transcript_path)
+        log.debug(f"Analysis: {len(analysis.todos)} todo(s), {len(analysis.files)} file(s), "
+                  f"summary: {analysis.summary[:80]!r}")
+        return analysis
+    except Exception as e:
+        log.error(f"Analysis error: {str(e)}")
+        return AnalysisResult()
+
+
+def get_git_snapshot(transcript_path, work_dir):
+    """
+    Snapshot the working tree, reused while the transcript is unchanged
+    Returns: GitSnapshot, or None if work_dir is not a git repository
+    """
+    cache_key = f"git_snapshot:{work_dir}"
+    if transcript_path:
+        cached = get_cached_value(transcript_path, cache_key)
+        if cached is not None:
+            log.debug("Git snapshot reused from cache")
+            return GitSnapshot.from_dict(cached)
+
+    with span('git_status'):
+        snapshot = take_snapshot(work_dir)
+
+    if snapshot is not None and transcript_path:
+        set_cached_value(transcript_path, cache_key, snapshot.to_dict())
+    return snapshot
+
+
+def get_git_delta(transcript_path, work_dir, baseline):
+    """
+    Files changed since the session baseline, reused while the transcript is unchanged
+    Returns: list of numstat dicts, or None if git fails
+    """
+    cache_key = f"git_delta:{work_dir}"
+    if transcript_path:
+        cached = get_cached_value(transcript_path, cache_key)
+        if cached is not None:
+            return cached
+
+    with span('git_delta'):
+        files = diff_baseline(baseline)
+
+    if files is not None and transcript_path:
+        set_cached_value(transcript_path, cache_key, files)
+    return files
+
+
+def build_message_payload(channel, title, message):
+    """Slack message with a header (title) and one mrkdwn section"""
+    return {
+        "channel": channel,
+        "text": title,
+        "blocks": [
+            {
+                "type": "header",
+                "text": {
+                    "type": "plain_text",
+                    "text": title,
+                    "emoji": True
+                }
+            },
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": message
+                }
+            }
+        ]
+    }
+
+
+def send_slack_message(token, channel, title, message, session='', parent_key=None, thread_ts=None):
+    """
+    Send a message to Slack (through the durable outbox)
+    parent_key: thread key of the SessionStart message, used when thread_ts
+                is not known yet because that message was still queued
+    Returns: True if Slack accepted it right away
+    """
+    payload = build_message_payload(channel, title, message)
+    if thread_ts:
+        payload["thread_ts"] = thread_ts
+
+    try:
+        result = post_message(token, payload, session=session, parent_key=parent_key)
+    except Exception as e:
+        log.error(f"Slack outbox error: {str(e)}")
+        return False
+
+    if result is None:
+        log.warning("Slack unreachable, message queued for retry")
+        return False
+    if not result.get('ok'):
+        log.error(f"Slack API error: {result.get('error')}")
+    return result.get('ok', False)
+
+
+def update_session_message(token, channel, thread_ts, thread_key, title, message, session, coalesce_window=0):
+    """
+    Edit the session's rolling status message with chat.update
+    Bursts of updates are coalesced by the outbox (latest content wins);
+    coalesce_window=0 replaces any pending update and sends right away
+    """
+    payload = build_message_payload(channel, title, message)
+    if thread_ts:
+        payload["ts"] = thread_ts
+
+    try:
+        result = post_message(
+            token, payload, session=session, method='chat.update', parent_key=thread_key,
+            coalesce_key=f"update:{thread_key}", coalesce_window=coalesce_window
+        )
+    except Exception as e:
+        log.error(f"Slack outbox error: {str(e)}")
+        return False
+
+    if result is None:
+        log.debug("Session message update queued (coalesced or retrying)")
+        return False
+    if not result.get('ok'):
+        log.error(f"Slack API error: {result.get('error')}")
+    return result.get('ok', False)
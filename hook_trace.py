@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Hook Trace Module
+Lightweight per-phase timing for the hooks
+
+A hook run is wrapped in trace_hook(name) and its phases (analysis, git,
+Slack, GitLab push, ...) in span(phase). Spans are timed with the
+monotonic clock and kept in memory; when the hook run ends they are
+appended to traces/spans.jsonl in a single O_APPEND write, without a
+lock, so even the thin client that forwards to the daemon only pays for
+one write. Spans are folded into hourly latency histograms
+(traces/histograms.json, last ROLLING_HOURS hours) later, under the
+lock: by `hook_trace.py stats`, or by the writer that finds spans.jsonl
+over MAX_SPANS_BYTES, right before rotating it. traces/folded.json
+records how far spans.jsonl has been folded. span() outside a traced run
+is a no-op, so shared modules can use it freely.
+
+Usage:
+    hook_trace.py stats [--hours N]   # p50/p95/p99 per hook and phase
+    hook_trace.py tail [N]            # last N spans
+"""
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from file_lock import FileLock
+from hook_log import get_logger
+
+TRACE_DIR = Path(__file__).parent / 'traces'
+SPANS_FILE = TRACE_DIR / 'spans.jsonl'
+HISTOGRAM_FILE = TRACE_DIR / 'histograms.json'
+FOLD_CURSOR_FILE = TRACE_DIR / 'folded.json'
+LOCK_FILE = TRACE_DIR / '.lock'
+
+# spans.jsonl이 이 크기를 넘으면 히스토그램으로 접은 뒤 spans.jsonl.1로 교체
+MAX_SPANS_BYTES = 2 * 1024 * 1024
+# 히스토그램 보관 기간 (시간 단위 버킷)
+ROLLING_HOURS = 7 * 24
+# 버킷 상한 (ms), 마지막 버킷은 그 이상
+BUCKET_BOUNDS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000, 60000, 120000]
+
+# 데몬은 여러 이벤트를 스레드로 동시에 처리하므로 현재 trace는 스레드별
+_local = threading.local()
+
+log = get_logger('TRACE')
+
+
+class Trace:
+    """Spans recorded during one hook run"""
+
+    def __init__(self, hook):
+        self.hook = hook
+        self.wall_start = time.time()
+        self.start = time.monotonic()
+        self.spans = []
+        self.stack = []
+
+    def add(self, phase, started, ok):
+        self.spans.append({
+            'ts': round(self.wall_start + (started - self.start), 3),
+            'hook': self.hook,
+            'phase': phase,
+            'parent': self.stack[-1] if self.stack else None,
+            'ms': round((time.monotonic() - started) * 1000, 2),
+            'ok': ok,
+            'pid': os.getpid(),
+        })
+
+
+def current_trace():
+    return getattr(_local, 'trace', None)
+
+
+@contextmanager
+def span(phase):
+    """Time one phase of the current hook run (no-op when not tracing)"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+
+    started = time.monotonic()
+    ok = True
+    trace.stack.append(phase)
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        trace.stack.pop()
+        trace.add(phase, started, ok)
+
+
+@contextmanager
+def trace_hook(hook):
+    """Trace one hook run; spans are written when the block exits"""
+    previous = current_trace()
+    trace = Trace(hook)
+    _local.trace = trace
+    ok = True
+    try:
+        yield trace
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        _local.trace = previous
+        trace.add('total', trace.start, ok)
+        try:
+            write_trace(trace)
+        except Exception as e:
+            log.warning(f"Failed to write trace: {str(e)}")
+
+
+def bucket_index(ms):
+    for index, bound in enumerate(BUCKET_BOUNDS):
+        if ms <= bound:
+            return index
+    return len(BUCKET_BOUNDS)
+
+
+def write_trace(trace):
+    """Append the spans of a hook run (histograms are folded later by fold_spans)"""
+    TRACE_DIR.mkdir(parents=True, exist_ok=True)
+    data = ''.join(json.dumps(s, ensure_ascii=False) + '\n' for s in trace.spans).encode('utf-8')
+
+    # 잠금 없이 한 번에 추가 (O_APPEND 쓰기는 다른 프로세스의 쓰기와 섞이지 않음)
+    fd = os.open(str(SPANS_FILE), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+    try:
+        os.write(fd, data)
+        size = os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+
+    if size > MAX_SPANS_BYTES:
+        # 드묾: 교체하기 전에 히스토그램으로 접음
+        fold_spans()
+
+
+def read_new_spans(path, offset):
+    """
+    Complete span lines of path from offset on
+    Returns: (list of span dicts, new offset)
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except OSError:
+        return [], offset
+    # 쓰는 중인 마지막 줄은 다음 번에
+    end = data.rfind(b'\n') + 1
+    spans = []
+    for line in data[:end].splitlines():
+        try:
+            spans.append(json.loads(line.decode('utf-8')))
+        except ValueError:
+            continue
+    return spans, offset + end
+
+
+def fold_spans():
+    """Fold spans appended since the last fold into the hourly histograms; rotate spans.jsonl when large"""
+    if not SPANS_FILE.exists():
+        return
+    with FileLock(LOCK_FILE):
+        try:
+            with open(FOLD_CURSOR_FILE, 'r', encoding='utf-8') as f:
+                cursor = json.load(f)
+        except (OSError, ValueError):
+            cursor = {}
+        try:
+            inode = SPANS_FILE.stat().st_ino
+        except OSError:
+            return
+        # 교체된 뒤라면 새 파일의 처음부터
+        offset = cursor.get('offset', 0) if cursor.get('inode') == inode else 0
+        spans, offset = read_new_spans(SPANS_FILE, offset)
+        if not cursor and HISTOGRAM_FILE.exists():
+            # 이전 버전은 쓸 때 바로 접었으므로 그때까지 기록된 span은 건너뜀
+            folded_until = HISTOGRAM_FILE.stat().st_mtime
+            spans = [s for s in spans if s['ts'] > folded_until]
+
+        if os.path.getsize(SPANS_FILE) > MAX_SPANS_BYTES:
+            rotated = SPANS_FILE.with_name(SPANS_FILE.name + '.1')
+            os.replace(SPANS_FILE, rotated)
+            # 교체 직전에 추가된 줄도 접음
+            more, _ = read_new_spans(rotated, offset)
+            spans.extend(more)
+            inode, offset = None, 0
+
+        if spans:
+            histograms = load_histograms()
+            for s in spans:
+                hours = histograms.setdefault(str(int(s['ts'] // 3600)), {})
+                counts = hours.setdefault(s['hook'], {}).setdefault(s['phase'], [0] * (len(BUCKET_BOUNDS) + 1))
+                counts[bucket_index(s['ms'])] += 1
+
+            oldest = int(time.time() // 3600) - ROLLING_HOURS
+            for key in [key for key in histograms if int(key) <= oldest]:
+                del histograms[key]
+            write_json(HISTOGRAM_FILE, histograms)
+        write_json(FOLD_CURSOR_FILE, {'inode': inode, 'offset': offset})
+
+
+def write_json(path, value):
+    tmp_file = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(value, f, separators=(',', ':'))
+    os.replace(tmp_file, path)
+
+
+def load_histograms():
+    try:
+        with open(HISTOGRAM_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def percentile(counts, fraction):
+    """Estimate a percentile (ms) by interpolating inside the histogram bucket"""
+    total = sum(counts)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(counts):
+        if count and seen + count >= rank:
+            if index == len(BUCKET_BOUNDS):
+                return float(BUCKET_BOUNDS[-1])
+            lower = BUCKET_BOUNDS[index - 1] if index else 0
+            return lower + (BUCKET_BOUNDS[index] - lower) * (rank - seen) / count
+        seen += count
+    return float(BUCKET_BOUNDS[-1])
+
+
+def merged_histograms(hours):
+    """Sum hourly histograms of the last `hours` hours per (hook, phase)"""
+    since = int(time.time() // 3600) - hours
+    merged = {}
+    for hour, hooks in load_histograms().items():
+        if int(hour) <= since:
+            continue
+        for hook, phases in hooks.items():
+            for phase, counts in phases.items():
+                total = merged.setdefault((hook, phase), [0] * len(counts))
+                for index, count in enumerate(counts):
+                    total[index] += count
+    return merged
+
+
+def format_ms(value):
+    if value is None:
+        return '-'
+    if value >= BUCKET_BOUNDS[-1]:
+        return f">{BUCKET_BOUNDS[-1] // 1000}s"
+    return f"{value:.0f}ms" if value < 1000 else f"{value / 1000:.1f}s"
+
+
+def print_stats(hours):
+    fold_spans()
+    merged = merged_histograms(hours)
+    if not merged:
+        print(f"No spans recorded in the last {hours}h")
+        return
+
+    print(f"{'hook':<14} {'phase':<16} {'count':>6} {'p50':>8} {'p95':>8} {'p99':>8}")
+    # total을 먼저, 나머지 단계는 이름순
+    for hook, phase in sorted(merged, key=lambda k: (k[0], k[1] != 'total', k[1])):
+        counts = merged[(hook, phase)]
+        print(f"{hook:<14} {phase:<16} {sum(counts):>6} "
+              f"{format_ms(percentile(counts, 0.50)):>8} "
+              f"{format_ms(percentile(counts, 0.95)):>8} "
+              f"{format_ms(percentile(counts, 0.99)):>8}")
+
+
+def print_tail(count):
+    try:
+        with open(SPANS_FILE, 'r', encoding='utf-8') as f:
+            lines = f.readlines()[-count:]
+    except OSError:
+        lines = []
+    for line in lines:
+        try:
+            s = json.loads(line)
+        except ValueError:
+            continue
+        when = time.strftime('%H:%M:%S', time.localtime(s['ts']))
+        phase = f"{s['parent']}/{s['phase']}" if s.get('parent') else s['phase']
+        status = '' if s.get('ok', True) else '  (error)'
+        print(f"{when} {s['hook']:<14} {phase:<28} {s['ms']:>10.1f}ms{status}")
+
+
+def main():
+    args = sys.argv[1:]
+    command = args[0] if args else 'stats'
+
+    if command == 'stats':
+        hours = 24
+        if '--hours' in args:
+            hours = int(args[args.index('--hours') + 1])
+        print_stats(hours)
+    elif command == 'tail':
+        print_tail(int(args[1]) if len(args) > 1 else 20)
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
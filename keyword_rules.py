@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Keyword Rules Module
+Classifies user requests with keyword rules loaded from classify_rules.json
+
+All keywords of a rule section are compiled into one regex, so a request
+is scanned once for every keyword hit; rule priority is then resolved
+from the hit set, checking only rules that reference a hit keyword.
+Team rules in ~/.ultrathink.rules.json take precedence over the defaults.
+"""
+import json
+import re
+from pathlib import Path
+
+DEFAULT_RULES_FILE = Path(__file__).parent / 'classify_rules.json'
+USER_RULES_FILE = Path.home() / '.ultrathink.rules.json'
+
+# 섹션별 컴파일된 분류기 (프로세스당 한 번 로드)
+_classifiers = None
+
+
+class KeywordClassifier:
+    """Ordered keyword rules compiled into a single multi-pattern matcher"""
+
+    def __init__(self, rules):
+        self.rules = []
+        self.rules_by_keyword = {}
+
+        for index, rule in enumerate(rules):
+            groups = [[kw.lower() for kw in group] for group in rule.get('match', []) if group]
+            if not groups:
+                continue
+            self.rules.append((groups, rule.get('label')))
+            for group in groups:
+                for kw in group:
+                    self.rules_by_keyword.setdefault(kw, set()).add(len(self.rules) - 1)
+
+        keywords = sorted(self.rules_by_keyword, key=len, reverse=True)
+        # lookahead로 겹치는 키워드도 모두 찾음 (예: 'install' 안의 'all')
+        self.pattern = re.compile(
+            '(?=(' + '|'.join(re.escape(kw) for kw in keywords) + '))'
+        ) if keywords else None
+        # 같은 위치에서 더 긴 키워드에 가려지는 접두사 키워드
+        self.prefixes = {kw: [other for other in keywords if kw.startswith(other)] for kw in keywords}
+
+    def find_keywords(self, text):
+        """Return the set of keywords contained in text (one pass)"""
+        hits = set()
+        if self.pattern is None:
+            return hits
+        for match in self.pattern.finditer(text.lower()):
+            hits.update(self.prefixes[match.group(1)])
+        return hits
+
+    def classify(self, text):
+        """
+        Return the label of the first matching rule
+        Returns: (matched: bool, label: str or None)
+        """
+        hits = self.find_keywords(text)
+
+        candidates = set()
+        for kw in hits:
+            candidates |= self.rules_by_keyword[kw]
+
+        for index in sorted(candidates):
+            groups, label = self.rules[index]
+            if all(any(kw in hits for kw in group) for group in groups):
+                return True, label
+        return False, None
+
+
+def load_rules_file(path):
+    """Load a rules JSON file (empty dict if missing or invalid)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_classifier(section):
+    """Return the compiled classifier for a rule section ('summary', 'work_todos')"""
+    global _classifiers
+    if _classifiers is None:
+        default_rules = load_rules_file(DEFAULT_RULES_FILE)
+        user_rules = load_rules_file(USER_RULES_FILE)
+        sections = set(default_rules) | set(user_rules)
+        _classifiers = {
+            name: KeywordClassifier(user_rules.get(name, []) + default_rules.get(name, []))
+            for name in sections
+            if not name.startswith('_')
+        }
+    return _classifiers.get(section) or KeywordClassifier([])
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Push Queue Module
+Debounced background `git push` for the GitLab auto-push
+
+The pusher still commits locally on every turn, but instead of pushing
+it queues the branch here. A detached worker pushes each repository at
+most once per GITLAB_PUSH_INTERVAL seconds, so the commits of many turns
+go out in a single `git push`; SessionEnd flushes the queue right away.
+
+A queued branch remembers the session that asked for it (Slack session,
+thread key and work directory), and the worker posts each push result
+there: the sync notice on success, a failure notice otherwise. A branch
+that still fails after MAX_ATTEMPTS pushes is dropped from the queue
+with an error log and a Slack notice.
+
+State is kept per repository under the git directory:
+    claude-push-queue.json   pending branches, last push time and result
+    claude-push-queue.lock   guards the queue file (held briefly)
+    claude-push.lock         held while pushing, so the worker and a
+                             SessionEnd flush of another session never
+                             push the same repository at the same time
+    claude-push-worker.lock  held by the running worker for its lifetime
+
+Usage:
+    push_queue.py status [DIR]   # show the queue of a repository
+    push_queue.py flush [DIR]    # push everything queued now
+    push_queue.py worker GIT_DIR # background worker (started automatically)
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from file_lock import FileLock
+from hook_log import get_logger
+
+QUEUE_FILE_NAME = 'claude-push-queue.json'
+QUEUE_LOCK_NAME = 'claude-push-queue.lock'
+PUSH_LOCK_NAME = 'claude-push.lock'
+WORKER_LOCK_NAME = 'claude-push-worker.lock'
+
+# 워커가 한 번에 자는 최대 시간 (다른 세션이 큐를 비웠는지 확인)
+POLL_INTERVAL = 5
+# 실패한 푸시를 다시 시도하는 최대 횟수 (다음 턴 커밋이 다시 큐에 넣음)
+MAX_ATTEMPTS = 3
+
+log = get_logger('PUSH_QUEUE')
+
+
+def get_git_dir(work_dir=None):
+    """Common git directory of the repository (shared by all worktrees), or None"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--git-common-dir'],
+            cwd=work_dir,
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return Path(work_dir or os.getcwd()) / result.stdout.strip()
+
+
+def load_state(git_dir):
+    try:
+        with open(Path(git_dir) / QUEUE_FILE_NAME, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault('pending', {})
+    state.setdefault('interval', 0)
+    state.setdefault('last_push', 0)
+    state.setdefault('last_result', None)
+    return state
+
+
+def save_state(git_dir, state):
+    queue_file = Path(git_dir) / QUEUE_FILE_NAME
+    tmp_file = queue_file.with_name(f"{queue_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_file, queue_file)
+
+
+def request_push(git_dir, remote, branch, interval, start_worker=True, notify=None):
+    """
+    Queue a push of remote/branch and make sure a worker will do it
+    start_worker: False when the caller flushes the queue itself
+    notify: {'session', 'thread_key', 'work_dir'} the worker reports the result to (None = log only)
+    Returns: (seconds until the push is due, result of the last push or None)
+    """
+    now = time.time()
+    with FileLock(Path(git_dir) / QUEUE_LOCK_NAME):
+        state = load_state(git_dir)
+        key = f"{remote}/{branch}"
+        entry = state['pending'].get(key, {'remote': remote, 'branch': branch, 'attempts': 0})
+        entry['requested'] = now
+        if notify:
+            entry['notify'] = notify
+        state['pending'][key] = entry
+        state['interval'] = interval
+        save_state(git_dir, state)
+        due = max(0, int(state['last_push'] + interval - now))
+
+        # 워커 잠금은 큐 잠금 안에서 확인 (워커도 큐 잠금 안에서 종료)
+        if start_worker:
+            ensure_worker(git_dir)
+    return due, state['last_result']
+
+
+def ensure_worker(git_dir):
+    """Start a detached worker unless one already holds the worker lock"""
+    try:
+        with FileLock(Path(git_dir) / WORKER_LOCK_NAME, blocking=False):
+            pass
+    except OSError:
+        return False
+
+    kwargs = {}
+    if os.name == 'nt':
+        kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs['start_new_session'] = True
+    try:
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'worker', str(git_dir)],
+            cwd=os.getcwd(),
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs
+        )
+    except OSError as e:
+        log.warning(f"Failed to start push worker: {str(e)}")
+        return False
+    log.debug(f"Push worker started for {git_dir}")
+    return True
+
+
+def notify_result(entry, success, message):
+    """Post the result of a queued push to the Slack session that requested it"""
+    notify = entry.get('notify')
+    if not notify:
+        return
+    from hook_config import load_config
+    from hook_report import send_slack_message
+
+    config = load_config(notify['work_dir'])
+    token = config['SLACK_BOT_TOKEN']
+    if not token:
+        return
+    project = f"\n\n:open_file_folder: 프로젝트: `{notify['work_dir']}`"
+    if success:
+        send_slack_message(token, config['SLACK_CHANNEL_ID'], "✅ 작업 완료",
+                           f"🔄 *GitLab 동기화 완료*\n\n✅ {message}{project}",
+                           notify.get('session', ''), notify.get('thread_key'))
+    else:
+        send_slack_message(token, config['SLACK_CHANNEL_ID'], "⚠️ GitLab 동기화 실패",
+                           f"❌ Push failed: {message}{project}",
+                           notify.get('session', ''), notify.get('thread_key'))
+
+
+def push_pending(git_dir, notify=False):
+    """
+    Push every queued branch now (one `git push` per branch, however many commits)
+    notify: post each result to the Slack session of its entry (background worker)
+    Returns: list of (success, message)
+    """
+    from auto_push_gitlab import push_to_gitlab
+
+    results = []
+    with FileLock(Path(git_dir) / PUSH_LOCK_NAME):
+        with FileLock(Path(git_dir) / QUEUE_LOCK_NAME):
+            state = load_state(git_dir)
+            entries = list(state['pending'].values())
+            state['pending'] = {}
+            save_state(git_dir, state)
+
+        failed = []
+        for entry in entries:
+            success, message = push_to_gitlab(entry['remote'], entry['branch'])
+            if not success:
+                entry['attempts'] = entry.get('attempts', 0) + 1
+                if entry['attempts'] < MAX_ATTEMPTS:
+                    failed.append(entry)
+                    message = f"{message} (retry {entry['attempts']}/{MAX_ATTEMPTS - 1} queued)"
+                else:
+                    log.error(f"Push of {entry['remote']}/{entry['branch']} dropped after "
+                              f"{entry['attempts']} attempts: {message}")
+                    message = f"{message} (gave up after {entry['attempts']} attempts)"
+            results.append((success, message))
+            if notify:
+                try:
+                    notify_result(entry, success, message)
+                except Exception as e:
+                    log.error(f"Push result notification error: {str(e)}")
+
+        if entries:
+            with FileLock(Path(git_dir) / QUEUE_LOCK_NAME):
+                state = load_state(git_dir)
+                state['last_push'] = time.time()
+                state['last_result'] = {
+                    'ok': all(success for success, _ in results),
+                    'messages': [message for _, message in results],
+                }
+                for entry in failed:
+                    # 그 사이 새로 들어온 요청이 있으면 그대로 둠
+                    state['pending'].setdefault(f"{entry['remote']}/{entry['branch']}", entry)
+                save_state(git_dir, state)
+    return results
+
+
+def run_worker(git_dir):
+    """Background worker: push the queue whenever it is due, exit when it is empty"""
+    worker_lock = FileLock(Path(git_dir) / WORKER_LOCK_NAME, blocking=False)
+    try:
+        worker_lock.__enter__()
+    except OSError:
+        # 다른 워커가 실행 중
+        return
+
+    try:
+        while True:
+            with FileLock(Path(git_dir) / QUEUE_LOCK_NAME):
+                state = load_state(git_dir)
+                if not state['pending']:
+                    # 요청 쪽이 워커 잠금을 보기 전에 종료 (큐 잠금 안에서 해제)
+                    worker_lock.__exit__(None, None, None)
+                    worker_lock = None
+                    return
+                wait = state['last_push'] + state['interval'] - time.time()
+
+            if wait > 0:
+                time.sleep(min(wait, POLL_INTERVAL))
+                continue
+
+            for success, message in push_pending(git_dir, notify=True):
+                if success:
+                    log.info(f"Queued push completed: {message}")
+                else:
+                    log.error(f"Queued push failed: {message}")
+    finally:
+        if worker_lock is not None:
+            worker_lock.__exit__(None, None, None)
+
+
+def print_status(git_dir):
+    state = load_state(git_dir)
+    if state['pending']:
+        due = max(0, int(state['last_push'] + state['interval'] - time.time()))
+        for key, entry in state['pending'].items():
+            print(f"pending  {key} (attempts: {entry.get('attempts', 0)}, due in {due}s)")
+    else:
+        print("No pushes queued")
+    if state['last_push']:
+        when = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(state['last_push']))
+        print(f"last push {when}: {json.dumps(state['last_result'], ensure_ascii=False)}")
+
+
+def main():
+    args = sys.argv[1:]
+    command = args[0] if args else 'status'
+
+    if command == 'worker' and len(args) == 2:
+        run_worker(args[1])
+        return
+
+    if len(args) > 1:
+        # 푸시는 현재 디렉토리 기준으로 실행
+        os.chdir(args[1])
+    git_dir = get_git_dir()
+    if git_dir is None:
+        print("Not a git repository", file=sys.stderr)
+        sys.exit(1)
+    if command == 'status':
+        print_status(git_dir)
+    elif command == 'flush':
+        results = push_pending(git_dir)
+        for success, message in results:
+            print(message)
+        sys.exit(0 if all(success for success, _ in results) else 1)
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Repo Lock Module
+Cross-session advisory lock for auto-commits into one repository
+
+Sessions that auto-commit into the same repository take an exclusive
+file_lock.FileLock on .git/claude-repo.lock before touching the index,
+instead of deleting .git/index.lock. Waiting is bounded and retried with
+jittered exponential backoff. The holder writes its PID, host and start
+time into the lock file, so a waiter that gives up can say who is
+holding it.
+
+The OS drops the lock when its process dies, so a crashed session never
+leaves it behind. On filesystems without lock support (some network
+mounts) the commit goes ahead unlocked, protected only by git's own
+index.lock, and a warning is logged.
+
+git's own index.lock is never removed: the auto-commit waits for it
+(same bound and backoff). One older than INDEX_LOCK_STALE_AGE is most
+likely left over from a crashed git; it is reported in the log so the
+user can remove it, and the commit is skipped.
+
+Usage:
+    repo_lock.py status [DIR]   # show the lock owner and index.lock age
+"""
+import errno
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from file_lock import FileLock
+from hook_log import get_logger
+
+# 다른 프로세스가 잠금을 가진 경우의 errno (그 밖의 오류는 잠금 미지원)
+BUSY_ERRNOS = (errno.EWOULDBLOCK, errno.EAGAIN, errno.EACCES, errno.EDEADLK)
+
+LOCK_FILE_NAME = 'claude-repo.lock'
+
+# 잠금 대기 최대 시간 (초)
+LOCK_TIMEOUT = 20
+# 재시도 간격: 50ms부터 두 배씩, 최대 1초 (지터 포함)
+BACKOFF_START = 0.05
+BACKOFF_MAX = 1.0
+# index.lock을 버려진 것으로 보는 나이 (초) - git 명령은 이렇게 오래 잡지 않음
+INDEX_LOCK_STALE_AGE = 600
+
+log = get_logger('REPO_LOCK')
+
+
+class RepoLockTimeout(Exception):
+    """The repository lock (or git's index.lock) stayed busy past the deadline"""
+
+
+def backoff_delays(timeout):
+    """Jittered exponential sleeps until the deadline runs out"""
+    deadline = time.monotonic() + timeout
+    delay = BACKOFF_START
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        yield min(remaining, delay * random.uniform(0.5, 1.5))
+        delay = min(delay * 2, BACKOFF_MAX)
+
+
+def read_owner(path):
+    """Owner info written by the lock holder ({} if unknown)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            owner = json.loads(f.read() or '{}')
+        return owner if isinstance(owner, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def describe_owner(owner):
+    if not owner:
+        return 'unknown owner'
+    age = int(time.time() - owner.get('acquired', time.time()))
+    return f"pid {owner.get('pid')} on {owner.get('host')} ({owner.get('purpose', '')}, {age}s)"
+
+
+class RepoLock:
+    """
+    Exclusive, cross-process lock on a repository (context manager)
+    Raises: RepoLockTimeout if it is still held by someone else after `timeout` seconds
+    """
+
+    def __init__(self, git_dir, purpose='', timeout=LOCK_TIMEOUT):
+        self.path = Path(git_dir) / LOCK_FILE_NAME
+        self.purpose = purpose
+        self.timeout = timeout
+        self.lock = None
+
+    def owner_info(self):
+        return {'pid': os.getpid(), 'host': socket.gethostname(), 'acquired': time.time(), 'purpose': self.purpose}
+
+    def try_lock(self):
+        """
+        Returns: True if locked, False if busy
+        Raises: OSError if the filesystem does not support locking
+        """
+        lock = FileLock(self.path, blocking=False)
+        try:
+            lock.acquire()
+        except OSError as e:
+            if e.errno in BUSY_ERRNOS:
+                return False
+            raise
+        self.lock = lock
+        return True
+
+    def acquire(self):
+        try:
+            for delay in itertools.chain([0], backoff_delays(self.timeout)):
+                time.sleep(delay)
+                if self.try_lock():
+                    break
+        except OSError as e:
+            # 잠금을 지원하지 않는 파일 시스템: git의 index.lock만으로 보호
+            log.warning(f"Repository lock unavailable ({str(e)}), committing without it")
+            return
+
+        if self.lock is None:
+            raise RepoLockTimeout(f"repository locked by {describe_owner(read_owner(self.path))}")
+
+        # 잠근 뒤에 소유자 정보 기록 (FileLock은 'a+'로 열므로 보유자의 정보를 지우지 않음)
+        self.lock.file.seek(0)
+        self.lock.file.truncate()
+        self.lock.file.write(json.dumps(self.owner_info()))
+        self.lock.file.flush()
+
+    def release(self):
+        if self.lock is None:
+            return
+        try:
+            self.lock.file.seek(0)
+            self.lock.file.truncate()
+        except OSError:
+            pass
+        finally:
+            self.lock.release()
+            self.lock = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+def get_index_lock(work_dir=None):
+    """Path of git's index.lock for the current worktree (None if not a repository)"""
+    try:
+        result = subprocess.run(
+            ['git', 'rev-parse', '--git-path', 'index.lock'],
+            cwd=work_dir,
+            capture_output=True,
+            text=True,
+            timeout=5
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return Path(work_dir or os.getcwd()) / result.stdout.strip()
+
+
+def wait_for_index_lock(index_lock, timeout=LOCK_TIMEOUT):
+    """
+    Wait until git's index.lock is released (call while holding RepoLock)
+    The lock is never removed; one older than INDEX_LOCK_STALE_AGE is only reported.
+    Raises: RepoLockTimeout if index.lock is still there after `timeout` seconds or looks stale
+    """
+    if index_lock is None:
+        return
+    for delay in itertools.chain([0], backoff_delays(timeout)):
+        time.sleep(delay)
+        try:
+            age = time.time() - os.stat(index_lock).st_mtime
+        except FileNotFoundError:
+            return
+        except OSError:
+            continue
+        if age > INDEX_LOCK_STALE_AGE:
+            # 비정상 종료한 git의 흔적일 가능성이 높지만, 사용 중일 수도 있으므로 지우지 않음
+            log.warning(f"{index_lock} is {int(age)}s old, probably left by a crashed git; "
+                        f"remove it if no git process is running")
+            raise RepoLockTimeout(f"stale index.lock ({int(age)}s old): {index_lock}")
+    raise RepoLockTimeout(f"index.lock held by another git process ({index_lock})")
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0] != 'status':
+        print(__doc__)
+        sys.exit(1)
+
+    from push_queue import get_git_dir
+    work_dir = args[1] if len(args) > 1 else None
+    git_dir = get_git_dir(work_dir)
+    if git_dir is None:
+        print("Not a git repository", file=sys.stderr)
+        sys.exit(1)
+
+    owner = read_owner(Path(git_dir) / LOCK_FILE_NAME)
+    print(f"repository lock: {describe_owner(owner) if owner else 'free'}")
+    index_lock = get_index_lock(work_dir)
+    if index_lock is not None and index_lock.exists():
+        print(f"index.lock: present ({int(time.time() - index_lock.stat().st_mtime)}s old)")
+    else:
+        print("index.lock: none")
+
+
+if __name__ == '__main__':
+    main()
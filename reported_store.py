@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Reported Items Store
+Remembers which todos/requests/plans were already reported to Slack
+
+Each session keeps an append-only binary file of fixed-width digests.
+A run loads the file into a set once and appends only the new digests,
+so the write cost is O(new items). When a session grows past its cap
+the file is compacted atomically, keeping the newest entries. Session
+files that were not touched for a while are removed by cleanup_stale_files().
+"""
+import glob
+import hashlib
+import os
+import time
+
+# 항목당 digest 크기 (bytes)
+DIGEST_SIZE = 8
+# 세션당 최대 보관 항목 수
+MAX_ENTRIES = 4096
+# 오래된 세션 파일 삭제 기준 (7일)
+STALE_AFTER = 7 * 24 * 60 * 60
+
+
+def make_digest(text):
+    """Return a short fixed-width digest of an item"""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=DIGEST_SIZE).digest()
+
+
+class ReportedStore:
+    """Append-only set of reported item digests for one session"""
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries = []
+        self.pending = []
+
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            data = b''
+
+        # 기록 중 잘린 마지막 digest는 버림 (뒤에 붙는 digest가 어긋나지 않도록)
+        usable = len(data) - len(data) % DIGEST_SIZE
+        if usable != len(data):
+            try:
+                os.truncate(path, usable)
+            except OSError:
+                pass
+        self.entries = [data[i:i + DIGEST_SIZE] for i in range(0, usable, DIGEST_SIZE)]
+        self.seen = set(self.entries)
+
+    def add(self, text):
+        """Record an item; returns True if it was not reported before"""
+        digest = make_digest(text)
+        if digest in self.seen:
+            return False
+        self.seen.add(digest)
+        self.pending.append(digest)
+        return True
+
+    def flush(self):
+        """Append new digests (one write) and compact if over the cap"""
+        if not self.pending:
+            return
+
+        with open(self.path, 'ab') as f:
+            # 다른 프로세스가 남긴 잘린 digest 뒤에 붙이면 이후 항목이 모두 어긋남
+            size = os.fstat(f.fileno()).st_size
+            if size % DIGEST_SIZE:
+                f.truncate(size - size % DIGEST_SIZE)
+            f.write(b''.join(self.pending))
+        self.entries.extend(self.pending)
+        self.pending = []
+
+        if len(self.entries) > self.max_entries:
+            self.compact()
+
+    def compact(self):
+        """Atomically rewrite the file keeping the newest 3/4 of the cap"""
+        keep = self.entries[-(self.max_entries * 3 // 4):]
+        tmp_file = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(b''.join(keep))
+        os.replace(tmp_file, self.path)
+        self.entries = keep
+        self.seen = set(keep)
+
+
+def cleanup_stale_files(directory, patterns, max_age=STALE_AFTER):
+    """Remove session state files not modified within max_age seconds"""
+    cutoff = time.time() - max_age
+    removed = 0
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(directory, pattern)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    return removed
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Session Paths Module
+Paths the agent touched during a session, for session-scoped auto-commits
+
+Stop records the files of every analyzed turn (Edit/Write/MultiEdit/
+NotebookEdit paths) plus the paths its Bash commands removed or moved
+(rm, unlink, rmdir, git rm, mv, git mv) in a per-session file. The
+GitLab pusher then stages only those paths instead of `git add -A`, so
+unrelated local edits, build output and secrets stay out of the
+auto-commit and big trees aren't rescanned.
+
+Bash parsing is best effort: commands with globs, variables or command
+substitution are skipped, and `cd` is only followed inside one command
+line.
+
+Usage:
+    session_paths.py PPID   # print the recorded paths of a session
+"""
+import json
+import os
+import shlex
+import sys
+import tempfile
+from pathlib import Path
+
+# 명령 구분자 (shlex punctuation_chars 토큰)
+COMMAND_SEPARATORS = ('&&', '||', ';', '|', '&', ';;')
+# 경로로 해석할 수 없는 인자 (glob, 변수, 명령 치환)
+UNSAFE_CHARS = set('*?[]$`~{}')
+
+
+def get_paths_file(ppid):
+    return Path(tempfile.gettempdir()) / f'.claude-session-paths-{ppid}.json'
+
+
+def split_commands(command):
+    """Split a shell command line into token lists, one per simple command"""
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    segments = [[]]
+    for token in lexer:
+        if token in COMMAND_SEPARATORS:
+            segments.append([])
+        else:
+            segments[-1].append(token)
+    return [segment for segment in segments if segment]
+
+
+def path_arguments(tokens):
+    """Non-option arguments of a command (everything after `--` counts)"""
+    args = []
+    options_done = False
+    for token in tokens:
+        if not options_done and token == '--':
+            options_done = True
+        elif not options_done and token.startswith('-'):
+            continue
+        else:
+            args.append(token)
+    return args
+
+
+def parse_bash_paths(command, cwd):
+    """
+    Paths removed and created by one Bash command line
+    Returns: (removed, created) absolute paths
+    """
+    removed, created = [], []
+    try:
+        segments = split_commands(command)
+    except ValueError:
+        # 따옴표가 닫히지 않은 명령
+        return removed, created
+
+    for tokens in segments:
+        # 앞쪽의 환경 변수 지정 (FOO=1 rm ...) 건너뜀
+        while tokens and '=' in tokens[0] and not tokens[0].startswith('-'):
+            tokens = tokens[1:]
+        if not tokens:
+            continue
+
+        program = os.path.basename(tokens[0])
+        args = tokens[1:]
+        if program == 'git' and args and args[0] in ('rm', 'mv'):
+            if args[0] == 'rm' and '--cached' in args:
+                # 파일은 그대로 남음: 다시 스테이징하면 안 됨
+                continue
+            program, args = args[0], args[1:]
+
+        if program == 'cd':
+            targets = path_arguments(args)
+            if len(targets) == 1 and not UNSAFE_CHARS & set(targets[0]):
+                cwd = os.path.join(cwd, targets[0])
+            continue
+        if program not in ('rm', 'unlink', 'rmdir', 'mv'):
+            continue
+
+        paths = path_arguments(args)
+        if not paths or any(UNSAFE_CHARS & set(path) for path in paths):
+            continue
+        paths = [os.path.normpath(os.path.join(cwd, path)) for path in paths]
+        if program == 'mv':
+            if len(paths) < 2:
+                continue
+            removed.extend(paths[:-1])
+            created.append(paths[-1])
+        else:
+            removed.extend(paths)
+    return removed, created
+
+
+def load_session_paths(ppid):
+    """Recorded paths of a session (absolute, in first-seen order), or None if nothing was recorded"""
+    try:
+        with open(get_paths_file(ppid), 'r', encoding='utf-8') as f:
+            return json.load(f).get('paths')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def record_session_paths(ppid, work_dir, files, commands):
+    """
+    Add the files and Bash-removed/-moved paths of a turn to the session record
+    Returns: every path recorded for the session so far
+    """
+    paths = dict.fromkeys(load_session_paths(ppid) or [])
+    before = len(paths)
+
+    for path in files:
+        paths.setdefault(os.path.normpath(os.path.join(work_dir, path)))
+    for command in commands:
+        removed, created = parse_bash_paths(command.get('cmd', ''), work_dir)
+        for path in removed + created:
+            paths.setdefault(path)
+
+    if len(paths) != before or not get_paths_file(ppid).exists():
+        paths_file = get_paths_file(ppid)
+        tmp_file = paths_file.with_name(f"{paths_file.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump({'work_dir': str(work_dir), 'paths': list(paths)}, f, ensure_ascii=False)
+            os.replace(tmp_file, paths_file)
+        except OSError:
+            pass
+    return list(paths)
+
+
+def remove_session_paths(ppid):
+    try:
+        get_paths_file(ppid).unlink()
+    except OSError:
+        pass
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    paths = load_session_paths(sys.argv[1])
+    if paths is None:
+        print("No paths recorded for this session", file=sys.stderr)
+        sys.exit(1)
+    for path in paths:
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,8 @@ import subprocess
 import shutil
 from pathlib import Path
 
+from hook_config import ENV_FILE, parse_env_file
+
 
 def print_header(text):
     """Print section header"""
@@ -41,27 +43,16 @@ def print_info(text):
 
 def load_existing_config():
     """Load existing configuration from ~/.ultrathink.env"""
-    env_file = Path.home() / '.ultrathink.env'
-    config = {}
-
-    if not env_file.exists():
-        return config
+    if not ENV_FILE.exists():
+        return {}
 
     print_info("Found existing configuration")
-
-    with open(env_file, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                config[key.strip()] = value.strip().strip('"').strip("'")
-
-    return config
+    return parse_env_file(ENV_FILE)
 
 
 def save_config(config):
     """Save configuration to ~/.ultrathink.env"""
-    env_file = Path.home() / '.ultrathink.env'
+    env_file = ENV_FILE
 
     lines = [
         "# Claude Code Slack Hooks Configuration\n",
@@ -290,8 +281,12 @@ def copy_hook_files():
     files = [
         'SessionStart', 'SessionEnd', 'Stop', 'Notification',
         'session-start', 'session-end', 'stop', 'notification',
-        'analyze_transcript.py', 'auto_update.py',
-        'auto_push_gitlab.py', 'setup_gitlab.py', 'update'
+        'analyze_transcript.py', 'analysis_cache.py', 'reported_store.py',
+        'keyword_rules.py', 'classify_rules.json', 'batch_analyze.py',
+        'hook_daemon.py', 'slack_outbox.py', 'slack_client.py', 'digest_store.py',
+        'hook_config.py', 'hook_trace.py', 'hook_log.py', 'file_lock.py', 'hook_report.py',
+        'git_snapshot.py', 'session_paths.py', 'push_queue.py', 'repo_lock.py',
+        'auto_update.py', 'auto_push_gitlab.py', 'setup_gitlab.py', 'update'
     ]
 
     copied = 0
@@ -179,7 +179,13 @@ REM Step 3: Copy hook files
 echo.
 echo [*] Step 3: Hook 파일 복사 중...
 
-set "FILES=SessionStart SessionEnd Stop Notification analyze_transcript.py auto_update.py update"
+set "FILES=SessionStart SessionEnd Stop Notification"
+set "FILES=%FILES% analyze_transcript.py analysis_cache.py reported_store.py"
+set "FILES=%FILES% keyword_rules.py classify_rules.json batch_analyze.py"
+set "FILES=%FILES% hook_daemon.py slack_outbox.py slack_client.py digest_store.py"
+set "FILES=%FILES% hook_config.py hook_trace.py hook_log.py file_lock.py hook_report.py"
+set "FILES=%FILES% git_snapshot.py session_paths.py push_queue.py repo_lock.py"
+set "FILES=%FILES% auto_update.py update"
 
 for %%f in (%FILES%) do (
     if exist "%SCRIPT_DIR%%%f" (
@@ -281,7 +281,15 @@ fi
 # Step 3: Copy hook files
 print_msg step "Step 3: Hook 파일 복사 중..."
 
-HOOK_FILES=("SessionStart" "SessionEnd" "Stop" "Notification" "analyze_transcript.py" "auto_update.py" "update")
+HOOK_FILES=(
+    "SessionStart" "SessionEnd" "Stop" "Notification"
+    "analyze_transcript.py" "analysis_cache.py" "reported_store.py"
+    "keyword_rules.py" "classify_rules.json" "batch_analyze.py"
+    "hook_daemon.py" "slack_outbox.py" "slack_client.py" "digest_store.py"
+    "hook_config.py" "hook_trace.py" "hook_log.py" "file_lock.py" "hook_report.py"
+    "git_snapshot.py" "session_paths.py" "push_queue.py" "repo_lock.py"
+    "auto_update.py" "update"
+)
 
 for file in "${HOOK_FILES[@]}"; do
     if [ -f "$SCRIPT_DIR/$file" ]; then
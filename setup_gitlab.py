@@ -10,6 +10,8 @@ import urllib.request
 import urllib.error
 from pathlib import Path
 
+from hook_config import ENV_FILE, parse_env_file
+
 
 def print_header(text):
     """Print section header"""
@@ -38,24 +40,9 @@ def print_info(text):
     print(f"ℹ️  {text}")
 
 
-def load_env_file(env_path):
-    """Load environment variables from .env file"""
-    env_vars = {}
-    if not os.path.exists(env_path):
-        return env_vars
-
-    with open(env_path, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if line and not line.startswith('#') and '=' in line:
-                key, value = line.split('=', 1)
-                env_vars[key.strip()] = value.strip().strip('"').strip("'")
-    return env_vars
-
-
 def save_env_var(env_path, key, value):
     """Save or update environment variable in .env file"""
-    env_vars = load_env_file(env_path)
+    env_vars = parse_env_file(env_path)
     env_vars[key] = value
 
     # Read existing file to preserve comments and structure
@@ -165,8 +152,8 @@ def interactive_setup():
     """Interactive GitLab setup wizard"""
     print_header("GitLab Auto-Push Setup Wizard")
 
-    env_file = Path.home() / '.ultrathink.env'
-    env_vars = load_env_file(env_file)
+    env_file = ENV_FILE
+    env_vars = parse_env_file(env_file)
 
     # Step 1: Get GitLab instance URL
     print_step(1, "GitLab Instance")
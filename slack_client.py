@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Slack Client Module
+Shared Slack Web API client used by the outbox
+
+Keeps one keep-alive HTTPS connection per process (so the hook daemon and
+a flush cycle reuse TLS sessions), applies explicit connect/read timeouts
+and honors 429 Retry-After. Calls are paced by a token bucket whose state
+lives in a lock-protected file, so concurrent sessions on one machine
+share a single rate budget instead of each hitting Slack's limit.
+
+A request is sent again only when a reused connection turns out to have
+been closed by the server before any reply. Other failures (e.g. a read
+timeout after the request went out) are raised to the outbox, since
+Slack may already have posted the message.
+"""
+import http.client
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from file_lock import FileLock
+
+SLACK_HOST = 'slack.com'
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 10
+
+# 토큰 버킷: 초당 1회 (Slack chat.postMessage 제한), 최대 5회 연속
+BUCKET_RATE = 1.0
+BUCKET_CAPACITY = 5
+BUCKET_FILE = Path(__file__).parent / 'outbox' / 'slack-ratelimit.json'
+# 429에 Retry-After가 없을 때 대기 시간
+DEFAULT_RETRY_AFTER = 30
+
+_client = None
+_client_lock = threading.Lock()
+
+
+class SlackError(Exception):
+    """Transient Slack API failure; retry_after is the suggested delay (or None)"""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class SlackConnectionError(SlackError):
+    """slack.com unreachable"""
+
+
+class SlackRateLimited(SlackError):
+    """Rate limited by Slack (429) or by the local token bucket"""
+
+
+class TokenBucket:
+    """Token bucket shared by all processes through a state file"""
+
+    def __init__(self, path=BUCKET_FILE, rate=BUCKET_RATE, capacity=BUCKET_CAPACITY):
+        self.path = Path(path)
+        self.lock_path = self.path.with_suffix('.lock')
+        self.rate = rate
+        self.capacity = capacity
+
+    def load_state(self, now):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            return float(state['tokens']), float(state['updated']), float(state.get('blocked_until', 0))
+        except (OSError, ValueError, KeyError, TypeError):
+            return float(self.capacity), now, 0.0
+
+    def save_state(self, tokens, updated, blocked_until):
+        tmp_file = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'tokens': tokens, 'updated': updated, 'blocked_until': blocked_until}, f)
+        os.replace(tmp_file, self.path)
+
+    def try_acquire(self):
+        """
+        Take one token if available
+        Returns: 0 on success, otherwise seconds to wait before retrying
+        """
+        with FileLock(self.lock_path):
+            now = time.time()
+            tokens, updated, blocked_until = self.load_state(now)
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+            if blocked_until > now:
+                wait = blocked_until - now
+            elif tokens >= 1:
+                self.save_state(tokens - 1, now, blocked_until)
+                return 0
+            else:
+                wait = (1 - tokens) / self.rate
+
+            self.save_state(tokens, now, blocked_until)
+            return wait
+
+    def acquire(self, max_wait):
+        """Wait up to max_wait seconds for a token; raises SlackRateLimited otherwise"""
+        deadline = time.monotonic() + max_wait
+        while True:
+            wait = self.try_acquire()
+            if wait == 0:
+                return
+            if time.monotonic() + wait > deadline:
+                raise SlackRateLimited(f"local rate limit ({wait:.1f}s)", retry_after=wait)
+            time.sleep(wait)
+
+    def block(self, seconds):
+        """Pause every process after a 429 (Retry-After)"""
+        with FileLock(self.lock_path):
+            now = time.time()
+            tokens, updated, blocked_until = self.load_state(now)
+            self.save_state(0.0, now, max(blocked_until, now + seconds))
+
+
+def is_stale_connection(error, sent):
+    """
+    Whether a request failed because the server had already closed the keep-alive connection
+    sent: the request was written completely (only a disconnect without any response counts then)
+    """
+    if isinstance(error, http.client.RemoteDisconnected):
+        return True
+    return not sent and isinstance(error, (BrokenPipeError, ConnectionResetError))
+
+
+class SlackClient:
+    """Slack Web API client with a persistent connection"""
+
+    def __init__(self, bucket=None):
+        self.bucket = bucket or TokenBucket()
+        self.connection = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        if self.connection is None:
+            connection = http.client.HTTPSConnection(SLACK_HOST, timeout=CONNECT_TIMEOUT)
+            connection.connect()
+            connection.sock.settimeout(READ_TIMEOUT)
+            self.connection = connection
+        return self.connection
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def call(self, method, token, payload, max_wait=5):
+        """
+        Call a Web API method with a JSON body
+        Returns: parsed response (may have ok=False for permanent errors)
+        Raises: SlackError for failures worth retrying
+        """
+        self.bucket.acquire(max_wait)
+
+        headers = {
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json; charset=utf-8',
+        }
+        body = json.dumps(payload).encode('utf-8')
+
+        with self.lock:
+            for attempt in range(2):
+                reused = self.connection is not None
+                sent = False
+                try:
+                    connection = self.connect()
+                    connection.request('POST', f'/api/{method}', body=body, headers=headers)
+                    sent = True
+                    response = connection.getresponse()
+                    response_body = response.read()
+                    break
+                except (OSError, http.client.HTTPException) as e:
+                    self.close()
+                    # 재사용한 keep-alive 연결이 응답 전에 끊긴 경우만 새 연결로 재시도
+                    # (읽기 시간 초과 등은 Slack이 이미 처리했을 수 있으므로 중복 전송 방지)
+                    if attempt or not reused or not is_stale_connection(e, sent):
+                        raise SlackConnectionError(f"connection error: {str(e)}")
+
+            if response.will_close:
+                self.close()
+
+        if response.status == 429:
+            try:
+                retry_after = int(response.getheader('Retry-After', DEFAULT_RETRY_AFTER))
+            except ValueError:
+                retry_after = DEFAULT_RETRY_AFTER
+            self.bucket.block(retry_after)
+            raise SlackRateLimited(f"HTTP 429 (Retry-After: {retry_after}s)", retry_after=retry_after)
+        if response.status >= 500:
+            raise SlackError(f"HTTP {response.status}")
+
+        try:
+            return json.loads(response_body.decode('utf-8'))
+        except ValueError:
+            raise SlackError(f"invalid response (HTTP {response.status})")
+
+
+def get_client():
+    """Return the process-wide Slack client"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = SlackClient()
+        return _client
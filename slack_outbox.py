@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Slack Outbox Module
+Durable local queue for Slack messages sent by the hooks
+
+Messages are stored in a SQLite file under the hooks directory before any
+network I/O, so nothing is lost when slack.com is slow or unreachable.
+flush() delivers due messages through the shared keep-alive Slack client
+(slack_client.py), retries transient failures with exponential backoff
+(or Slack's Retry-After when rate limited) and keeps per-session order:
+a message is never sent before an earlier message of the same session.
+A message can reference the thread of an earlier one by key (SessionStart
+→ SessionEnd), which is resolved once the parent has been delivered; a
+chat.update call uses the same key to find the message it edits.
+Messages with a coalesce key replace any still-pending message with that
+key and are sent at most once per coalesce window.
+
+A message that could not be delivered right away (coalescing window,
+another process holding the flush lease, a retry due soon) is picked up
+by a detached deferred flusher. There is at most one per session: the
+hook registers it in the flushers table before starting it, and it keeps
+waiting until the
+session has nothing due within MAX_DEFERRED_WAIT, so later messages of
+the session don't start more processes.
+
+Usage:
+    slack_outbox.py status   # number of pending messages
+    slack_outbox.py flush    # deliver pending messages now
+    slack_outbox.py flush --wait N   # wait N seconds, then deliver
+    slack_outbox.py flush --wait N --session S --owner O   # deferred flusher of a session
+"""
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from hook_log import get_logger
+from hook_trace import span
+from slack_client import SlackConnectionError, SlackError, SlackRateLimited, get_client
+
+DEFAULT_DB = Path(__file__).parent / 'outbox' / 'slack-outbox.db'
+# 재시도 간격: 5초부터 2배씩, 최대 15분
+BACKOFF_BASE = 5
+BACKOFF_MAX = 15 * 60
+# 이 시간이 지나도 전송되지 않은 메시지는 폐기
+MAX_MESSAGE_AGE = 24 * 60 * 60
+# 스레드 키 보관 기간
+THREAD_KEY_AGE = 7 * 24 * 60 * 60
+# 재시도해도 되는 Slack API 오류
+RETRYABLE_ERRORS = ('ratelimited', 'internal_error', 'fatal_error', 'service_unavailable', 'request_timeout')
+# 지연 flush 프로세스가 기다리는 최대 시간 (더 뒤의 재시도는 다음 Hook/데몬이 처리)
+MAX_DEFERRED_WAIT = 120
+# 다른 프로세스가 flush 중일 때 다시 확인하는 간격 (초)
+LEASE_POLL = 2
+# 지연 flush 등록이 만료되는 여유 시간 (프로세스가 죽은 경우)
+FLUSHER_GRACE = 90
+# Hook이 메시지를 넣은 직전에 직접 전송을 시도하는 최대 시간 (나머지는 지연 flush/데몬)
+POST_FLUSH_TIME = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session TEXT NOT NULL,
+    method TEXT NOT NULL,
+    token TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    thread_key TEXT,
+    parent_key TEXT,
+    coalesce_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS threads (
+    key TEXT PRIMARY KEY,
+    ts TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS coalesced (
+    key TEXT PRIMARY KEY,
+    last_sent REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lease (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS flushers (
+    session TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+log = get_logger('OUTBOX')
+
+
+class SlackOutbox:
+    """SQLite-backed Slack message queue"""
+
+    def __init__(self, path=DEFAULT_DB):
+        self.path = Path(path)
+        # id()는 같은 프로세스에서 재사용될 수 있으므로 임의 값으로 구분
+        self.owner = f"{os.getpid()}-{os.urandom(4).hex()}"
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if not self.path.exists():
+                # 토큰이 저장되므로 소유자만 읽을 수 있게 생성
+                os.close(os.open(str(self.path), os.O_CREAT | os.O_WRONLY, 0o600))
+            self.conn = sqlite3.connect(str(self.path), timeout=5, isolation_level=None)
+            self.conn.executescript(SCHEMA)
+            # 이전 버전에서 만든 큐 파일 업그레이드
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(messages)")]
+            if 'coalesce_key' not in columns:
+                self.conn.execute("ALTER TABLE messages ADD COLUMN coalesce_key TEXT")
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def enqueue(self, token, payload, session='', method='chat.postMessage', thread_key=None, parent_key=None,
+                coalesce_key=None, coalesce_window=0):
+        """
+        Atomically add a message to the queue
+        thread_key: remember the delivered message's ts under this key
+        parent_key: post into the thread (or, for chat.update, edit the message) stored under this key
+        coalesce_key: replace pending messages with the same key, and send no
+                      sooner than coalesce_window seconds after the last one
+        Returns: (message id, seconds until the message is due)
+        """
+        conn = self.connect()
+        now = time.time()
+        next_attempt = now
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if coalesce_key:
+                conn.execute("DELETE FROM messages WHERE coalesce_key = ?", (coalesce_key,))
+                row = conn.execute("SELECT last_sent FROM coalesced WHERE key = ?", (coalesce_key,)).fetchone()
+                if row:
+                    next_attempt = max(now, row[0] + coalesce_window)
+            cursor = conn.execute(
+                "INSERT INTO messages (session, method, token, payload, thread_key, parent_key, coalesce_key, "
+                "next_attempt, created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (session, method, token, json.dumps(payload, ensure_ascii=False), thread_key, parent_key,
+                 coalesce_key, next_attempt, now)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return cursor.lastrowid, next_attempt - now
+
+    def pending_count(self):
+        return self.connect().execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def get_thread_ts(self, key):
+        row = self.connect().execute("SELECT ts FROM threads WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def acquire_lease(self, duration):
+        """Only one process flushes at a time; an expired lease is taken over"""
+        conn = self.connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires FROM lease WHERE id = 0").fetchone()
+            if row and row[0] != self.owner and row[1] > now:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("INSERT OR REPLACE INTO lease (id, owner, expires) VALUES (0, ?, ?)",
+                         (self.owner, now + duration))
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release_lease(self):
+        self.connect().execute("DELETE FROM lease WHERE id = 0 AND owner = ?", (self.owner,))
+
+    def time_until_due(self, session):
+        """Seconds until the session's earliest queued message is due (None if nothing is queued)"""
+        row = self.connect().execute("SELECT MIN(next_attempt) FROM messages WHERE session = ?",
+                                     (session,)).fetchone()
+        return None if row[0] is None else row[0] - time.time()
+
+    def flusher_waiting(self, session):
+        row = self.connect().execute("SELECT expires FROM flushers WHERE session = ?", (session,)).fetchone()
+        return bool(row and row[0] > time.time())
+
+    def claim_flusher(self, session, wait):
+        """
+        Register (or refresh) this process as the deferred flusher of a session
+        Returns: False if another live flusher is already waiting for it
+        """
+        conn = self.connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT owner, expires FROM flushers WHERE session = ?", (session,)).fetchone()
+            if row and row[0] != self.owner and row[1] > now:
+                conn.execute("ROLLBACK")
+                return False
+            conn.execute("INSERT OR REPLACE INTO flushers (session, owner, expires) VALUES (?, ?, ?)",
+                         (session, self.owner, now + wait + FLUSHER_GRACE))
+            conn.execute("COMMIT")
+            return True
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def release_flusher(self, session):
+        self.connect().execute("DELETE FROM flushers WHERE session = ? AND owner = ?", (session, self.owner))
+
+    def flush(self, max_time=15, session=None, message_id=None):
+        """
+        Deliver due messages in queue order
+        session: only deliver this session's messages
+        message_id: stop once this message has been delivered
+        Returns: {message id: Slack response} for messages handled in this call
+        """
+        results = {}
+        if not self.acquire_lease(max_time + 60):
+            return results
+
+        client = get_client()
+        deadline = time.monotonic() + max_time
+        try:
+            self.expire_old()
+            while time.monotonic() < deadline:
+                query = ("SELECT id, session, method, token, payload, thread_key, parent_key, coalesce_key, "
+                         "attempts, next_attempt FROM messages")
+                if session is None:
+                    rows = self.connect().execute(query + " ORDER BY id").fetchall()
+                else:
+                    rows = self.connect().execute(query + " WHERE session = ? ORDER BY id", (session,)).fetchall()
+
+                blocked = set()
+                progressed = False
+                for row in rows:
+                    (row_id, row_session, method, token, payload, thread_key, parent_key, coalesce_key,
+                     attempts, next_attempt) = row
+                    if row_session in blocked:
+                        continue
+                    # 같은 세션의 앞선 메시지가 대기 중이면 뒤 메시지도 대기
+                    if next_attempt > time.time() or time.monotonic() >= deadline:
+                        blocked.add(row_session)
+                        continue
+
+                    payload = json.loads(payload)
+                    if parent_key:
+                        thread_ts = self.get_thread_ts(parent_key)
+                        if method == 'chat.update':
+                            if thread_ts:
+                                payload['ts'] = thread_ts
+                            elif not payload.get('ts'):
+                                # 원본 메시지가 전송되지 못함 - 새 메시지로 게시
+                                method = 'chat.postMessage'
+                        elif thread_ts:
+                            payload['thread_ts'] = thread_ts
+
+                    try:
+                        with span('slack_post'):
+                            response = client.call(method, token, payload,
+                                                   max_wait=max(0, deadline - time.monotonic()))
+                        if not response.get('ok') and response.get('error') in RETRYABLE_ERRORS:
+                            raise SlackError(response.get('error'))
+                    except SlackRateLimited as e:
+                        # 제한은 모든 세션에 적용되므로 이번 flush는 중단
+                        self.schedule_retry(row_id, attempts, str(e), e.retry_after)
+                        return results
+                    except SlackConnectionError as e:
+                        # 네트워크 불가 - 다음 flush에서 다시 시도
+                        self.schedule_retry(row_id, attempts, str(e))
+                        return results
+                    except SlackError as e:
+                        self.schedule_retry(row_id, attempts, str(e))
+                        blocked.add(row_session)
+                        continue
+
+                    self.complete(row_id, thread_key, coalesce_key, response)
+                    results[row_id] = response
+                    progressed = True
+                    if row_id == message_id:
+                        return results
+
+                if not progressed:
+                    break
+        finally:
+            self.release_lease()
+        return results
+
+    def schedule_retry(self, message_id, attempts, reason, retry_after=None):
+        if retry_after is not None:
+            # 속도 제한은 실패가 아니므로 시도 횟수를 늘리지 않음
+            delay = retry_after
+        else:
+            delay = min(BACKOFF_BASE * (2 ** attempts), BACKOFF_MAX)
+            attempts += 1
+        self.connect().execute(
+            "UPDATE messages SET attempts = ?, next_attempt = ? WHERE id = ?",
+            (attempts, time.time() + delay, message_id)
+        )
+        log.warning(f"Message {message_id} failed ({reason}), retry in {delay:.0f}s")
+
+    def complete(self, message_id, thread_key, coalesce_key, response):
+        conn = self.connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+            if coalesce_key:
+                conn.execute("INSERT OR REPLACE INTO coalesced (key, last_sent) VALUES (?, ?)",
+                             (coalesce_key, time.time()))
+            if thread_key and response.get('ok') and response.get('ts'):
+                conn.execute("INSERT OR REPLACE INTO threads (key, ts, created) VALUES (?, ?, ?)",
+                             (thread_key, response['ts'], time.time()))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not response.get('ok'):
+            # 영구 오류 (invalid_auth, channel_not_found 등) - 재시도하지 않음
+            log.error(f"Message {message_id} rejected by Slack: {response.get('error')}")
+
+    def expire_old(self):
+        now = time.time()
+        conn = self.connect()
+        expired = conn.execute("DELETE FROM messages WHERE created < ?", (now - MAX_MESSAGE_AGE,)).rowcount
+        if expired:
+            log.warning(f"Dropped {expired} undeliverable message(s) older than {MAX_MESSAGE_AGE}s")
+        conn.execute("DELETE FROM threads WHERE created < ?", (now - THREAD_KEY_AGE,))
+        conn.execute("DELETE FROM coalesced WHERE last_sent < ?", (now - THREAD_KEY_AGE,))
+
+
+def session_thread_key(ppid, start_time):
+    """Thread key of the SessionStart message, shared with SessionEnd"""
+    return f"session-{ppid}-{start_time}"
+
+
+def start_deferred_flush(session, delay, owner):
+    """
+    Deliver the session's queue after delay seconds from a detached process
+    owner: flusher claim taken for the process, which it keeps refreshing
+    Returns: True if the process was started
+    """
+    try:
+        kwargs = {}
+        if os.name == 'nt':
+            kwargs['creationflags'] = subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP
+        else:
+            kwargs['start_new_session'] = True
+        subprocess.Popen(
+            [sys.executable, str(Path(__file__).resolve()), 'flush', '--wait', f"{delay:.1f}",
+             '--session', session, '--owner', owner],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            close_fds=True,
+            **kwargs
+        )
+        return True
+    except Exception as e:
+        log.warning(f"Failed to schedule deferred flush: {str(e)}")
+        return False
+
+
+def ensure_deferred_flush(outbox, session):
+    """Start the session's deferred flusher unless one is already waiting or nothing is due soon"""
+    wait = outbox.time_until_due(session)
+    if wait is None or wait > MAX_DEFERRED_WAIT:
+        return
+    wait = max(wait, LEASE_POLL)
+    # 등록을 먼저 잡아 두어야 동시에 끝난 Hook들이 각자 프로세스를 띄우지 않음
+    if outbox.claim_flusher(session, wait) and not start_deferred_flush(session, wait, outbox.owner):
+        outbox.release_flusher(session)
+
+
+def run_deferred_flush(session, delay, owner):
+    """
+    Deferred flusher of a session (detached process): deliver its queue as
+    messages become due, waiting out other processes' flush leases, and exit
+    once nothing of the session is due within MAX_DEFERRED_WAIT
+    """
+    outbox = SlackOutbox()
+    # 띄운 Hook이 잡아 둔 등록을 이어받음
+    outbox.owner = owner
+    try:
+        wait = delay
+        while True:
+            time.sleep(max(0, wait))
+            outbox.flush()
+            wait = outbox.time_until_due(session)
+            if wait is None or wait > MAX_DEFERRED_WAIT:
+                outbox.release_flusher(session)
+                # 해제 직전에 들어온 메시지 (그 Hook은 이 flusher를 보고 새로 시작하지 않았음)
+                wait = outbox.time_until_due(session)
+                if wait is None or wait > MAX_DEFERRED_WAIT or not outbox.claim_flusher(session, wait):
+                    return
+            # 아직 보낼 시점인데 남아 있으면 다른 프로세스가 flush 중
+            wait = max(wait, LEASE_POLL)
+            outbox.claim_flusher(session, wait)
+    finally:
+        outbox.close()
+
+
+def post_message(token, payload, session='', method='chat.postMessage', thread_key=None, parent_key=None,
+                 coalesce_key=None, coalesce_window=0):
+    """
+    Queue a Slack API call and try to deliver it right away
+    Only this session's messages up to the new one are sent, within
+    POST_FLUSH_TIME; other sessions' backlog is left to their deferred
+    flushers and the daemon, so a hook never waits on them.
+    Returns: Slack response dict, or None if the message stays queued (retry or coalescing)
+    """
+    outbox = SlackOutbox()
+    try:
+        with span('slack'):
+            message_id, delay = outbox.enqueue(token, payload, session, method, thread_key, parent_key,
+                                               coalesce_key, coalesce_window)
+            result = outbox.flush(POST_FLUSH_TIME, session=session, message_id=message_id).get(message_id)
+            if result is None:
+                # 병합 창, 다른 프로세스의 flush, 재시도 대기: 세션당 하나의 지연 flush가 처리
+                ensure_deferred_flush(outbox, session)
+            return result
+    finally:
+        outbox.close()
+
+
+def flush_pending(max_time=15):
+    """Deliver queued messages (no-op when the queue is empty)"""
+    if not DEFAULT_DB.exists():
+        return {}
+    outbox = SlackOutbox()
+    try:
+        if outbox.pending_count() == 0:
+            return {}
+        return outbox.flush(max_time)
+    finally:
+        outbox.close()
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'status'
+
+    if command == 'status':
+        outbox = SlackOutbox()
+        print(f"{outbox.pending_count()} pending message(s)")
+        outbox.close()
+    elif command == 'flush':
+        if len(sys.argv) == 8 and sys.argv[2] == '--wait' and sys.argv[4] == '--session':
+            run_deferred_flush(sys.argv[5], float(sys.argv[3]), sys.argv[7])
+            return
+        if len(sys.argv) == 4 and sys.argv[2] == '--wait':
+            time.sleep(float(sys.argv[3]))
+        results = flush_pending()
+        print(f"{len(results)} message(s) delivered")
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -20,6 +20,24 @@ xcopy /Y /Q "session-end" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
 xcopy /Y /Q "stop" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
 xcopy /Y /Q "notification" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
 xcopy /Y /Q "analyze_transcript.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "analysis_cache.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "reported_store.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "keyword_rules.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "classify_rules.json" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "batch_analyze.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "hook_daemon.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "slack_outbox.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "slack_client.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "digest_store.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "hook_config.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "hook_trace.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "hook_log.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "file_lock.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "hook_report.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "git_snapshot.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "session_paths.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "push_queue.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
+xcopy /Y /Q "repo_lock.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
 xcopy /Y /Q "auto_update.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
 xcopy /Y /Q "auto_push_gitlab.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
 xcopy /Y /Q "setup_gitlab.py" "%USERPROFILE%\.claude-hooks\" >nul 2>&1
@@ -14,7 +14,12 @@ cd "$(dirname "$0")"
 echo "[1/3] 파일 복사 중..."
 cp -f SessionStart SessionEnd Stop Notification ~/.claude-hooks/ 2>/dev/null
 cp -f session-start session-end stop notification ~/.claude-hooks/ 2>/dev/null
-cp -f analyze_transcript.py auto_update.py auto_push_gitlab.py setup_gitlab.py update ~/.claude-hooks/ 2>/dev/null
+cp -f analyze_transcript.py analysis_cache.py reported_store.py ~/.claude-hooks/ 2>/dev/null
+cp -f keyword_rules.py classify_rules.json batch_analyze.py ~/.claude-hooks/ 2>/dev/null
+cp -f hook_daemon.py slack_outbox.py slack_client.py digest_store.py ~/.claude-hooks/ 2>/dev/null
+cp -f hook_config.py hook_trace.py hook_log.py file_lock.py hook_report.py ~/.claude-hooks/ 2>/dev/null
+cp -f git_snapshot.py session_paths.py push_queue.py repo_lock.py ~/.claude-hooks/ 2>/dev/null
+cp -f auto_update.py auto_push_gitlab.py setup_gitlab.py update ~/.claude-hooks/ 2>/dev/null
 chmod +x ~/.claude-hooks/* 2>/dev/null
 echo "  ✅ 파일 복사 완료"
 